@@ -0,0 +1,40 @@
+import time
+from fastapi import FastAPI, Request
+from starlette.routing import Match
+
+from app.core.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_PROGRESS
+
+def _route_template(request: Request) -> str:
+    """Path template of the matched route, so ``/ideas/42`` is recorded as ``/ideas/{idea_id}``."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    # Unmatched paths are collapsed so scanners can't blow up label cardinality
+    return "unmatched"
+
+def add_metrics(app: FastAPI):
+    """Add per-route latency and in-flight request metrics to the FastAPI application.
+
+    Added last so it wraps the other middleware: the recorded latency
+    includes scheduler queueing, and 429/503 rejections are counted too.
+    For streamed responses the time is to the first byte, not the full body.
+    """
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        start = time.perf_counter()
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=request.method,
+                route=_route_template(request),
+                status=str(status)
+            )
\ No newline at end of file
@@ -1,34 +1,171 @@
+import math
+import os
+import sqlite3
+import threading
 import time
+from collections import OrderedDict
+from typing import Tuple
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
+from app.api.middlewares.route_rules import match_route_rule, parse_route_rules
 from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_REJECTIONS
 
-# Rate limiting storage
-request_counts = {}
+class LocalRateLimitBackend:
+    """Token buckets for this process only.
+
+    Each key costs O(1) per request. Buckets are kept in least recently
+    used order, so idle ones are dropped from the front as requests come in;
+    a bucket idle for ``idle_ttl`` has refilled anyway, so nothing is lost.
+    """
+
+    blocking = False
+
+    def __init__(self, idle_ttl: float, max_keys: int = 100000):
+        self.idle_ttl = idle_ttl
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, cost: float, capacity: float, rate: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            allowed, tokens, retry_after = _take(tokens, updated, now, cost, capacity, rate)
+            self._buckets[key] = (tokens, now)
+
+            # Evict idle buckets; the oldest is always at the front
+            while self._buckets:
+                oldest_key, (_, oldest_updated) = next(iter(self._buckets.items()))
+                if now - oldest_updated < self.idle_ttl and len(self._buckets) <= self.max_keys:
+                    break
+                del self._buckets[oldest_key]
+
+        return allowed, retry_after
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+class SQLiteRateLimitBackend:
+    """Token buckets in a SQLite file shared by every worker on the host.
+
+    Each request is one short ``BEGIN IMMEDIATE`` transaction on its key, so
+    the configured limit holds across workers instead of per worker. Idle
+    buckets are purged every ``purge_every`` requests. If the database stays
+    locked past the busy timeout the request is let through (fail open)
+    rather than turned into an error.
+    """
+
+    # consume() may wait on the file lock, so it is called off the event loop
+    blocking = True
+
+    def __init__(self, path: str, idle_ttl: float, purge_every: int = 1000):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.idle_ttl = idle_ttl
+        self.purge_every = purge_every
+        self._requests = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=1.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def consume(self, key: str, cost: float, capacity: float, rate: float) -> Tuple[bool, float]:
+        # Wall-clock time, since monotonic clocks aren't comparable across processes
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                row = self._conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                allowed, tokens, retry_after = _take(tokens, updated, now, cost, capacity, rate)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now)
+                )
+
+                self._requests += 1
+                if self._requests % self.purge_every == 0:
+                    self._conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.idle_ttl,))
+
+                self._conn.execute("COMMIT")
+            except sqlite3.OperationalError as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                print(f"Rate limit store unavailable, allowing request: {e}")
+                return True, 0.0
+            except Exception:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+
+        return allowed, retry_after
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+def _take(tokens: float, updated: float, now: float, cost: float,
+          capacity: float, rate: float) -> Tuple[bool, float, float]:
+    """Refill a bucket and try to take ``cost`` tokens.
+
+    Returns ``(allowed, remaining_tokens, retry_after_seconds)``.
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate if rate > 0 else float(settings.RATE_LIMIT_WINDOW)
+
+def create_rate_limit_backend():
+    """Build the backend selected by ``RATE_LIMIT_BACKEND``."""
+    # A bucket refills completely within one window, so idle keys can go then
+    idle_ttl = max(settings.RATE_LIMIT_WINDOW, settings.RATE_LIMIT_IDLE_TTL)
+
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimitBackend(settings.RATE_LIMIT_SQLITE_PATH, idle_ttl)
+    if settings.RATE_LIMIT_BACKEND == "local":
+        return LocalRateLimitBackend(idle_ttl)
+    raise ValueError(f"Unknown rate limit backend: {settings.RATE_LIMIT_BACKEND}")
 
 def add_rate_limiter(app: FastAPI):
-    """Add rate limiting middleware to the FastAPI application."""
-    
+    """Add rate limiting middleware to the FastAPI application.
+
+    Each client IP gets a token bucket holding ``RATE_LIMIT_REQUESTS``
+    tokens that refills over ``RATE_LIMIT_WINDOW`` seconds. Requests take
+    tokens according to ``RATE_LIMIT_ROUTE_COSTS``, so generating ideas
+    costs more than a health check; zero-cost routes are never limited.
+    """
+    backend = create_rate_limit_backend()
+    rules = parse_route_rules(settings.RATE_LIMIT_ROUTE_COSTS, float)
+    capacity = float(settings.RATE_LIMIT_REQUESTS)
+    rate = capacity / settings.RATE_LIMIT_WINDOW
+
     @app.middleware("http")
     async def rate_limit_middleware(request: Request, call_next):
-        client_ip = request.client.host
-        current_time = time.time()
-        
-        # Clean up old requests
-        for ip in list(request_counts.keys()):
-            request_counts[ip] = [timestamp for timestamp in request_counts[ip] 
-                                if current_time - timestamp < settings.RATE_LIMIT_WINDOW]
-        
-        # Check rate limit
-        if client_ip in request_counts:
-            if len(request_counts[client_ip]) >= settings.RATE_LIMIT_REQUESTS:
-                return JSONResponse(
-                    status_code=429,
-                    content={"detail": "Rate limit exceeded. Please try again later."}
-                )
-            request_counts[client_ip].append(current_time)
+        cost = match_route_rule(rules, request.method, request.url.path)
+        if cost is None:
+            cost = 1.0
+        if cost <= 0:
+            return await call_next(request)
+
+        client_ip = request.client.host if request.client else "unknown"
+        if backend.blocking:
+            allowed, retry_after = await run_in_threadpool(backend.consume, client_ip, cost, capacity, rate)
         else:
-            request_counts[client_ip] = [current_time]
-        
+            allowed, retry_after = backend.consume(client_ip, cost, capacity, rate)
+
+        if not allowed:
+            RATE_LIMIT_REJECTIONS.inc()
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded. Please try again later."},
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
         response = await call_next(request)
         return response
\ No newline at end of file
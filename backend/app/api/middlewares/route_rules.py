@@ -0,0 +1,36 @@
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+RouteRule = Tuple[Optional[str], str, T]
+
+def parse_route_rules(spec: str, convert: Callable[[str], T]) -> List[RouteRule]:
+    """Parse ``"POST /ideas=10,/health=0"`` into (method, path prefix, value) rules.
+
+    Paths are relative to ``API_V1_STR``; the method is optional. Rules are
+    ordered most specific first, whatever order the spec lists them in:
+    longer prefixes first, and for the same prefix a method-specific rule
+    before a method-less one.
+    """
+    rules = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        route, value = item.rsplit("=", 1)
+        parts = route.split()
+        method, prefix = (parts[0].upper(), parts[1]) if len(parts) == 2 else (None, parts[0])
+        rules.append((method, prefix, convert(value.strip())))
+
+    return sorted(rules, key=lambda rule: (-len(rule[1]), rule[0] is None))
+
+def match_route_rule(rules: List[RouteRule], method: str, path: str) -> Optional[T]:
+    """Value of the first rule matching the request, or None."""
+    if path.startswith(settings.API_V1_STR):
+        path = path[len(settings.API_V1_STR):] or "/"
+
+    for rule_method, prefix, value in rules:
+        if (rule_method is None or rule_method == method) and path.startswith(prefix):
+            return value
+    return None
\ No newline at end of file
@@ -0,0 +1,196 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from app.api.middlewares.route_rules import match_route_rule, parse_route_rules
+from app.core.config import settings
+from app.core.metrics import SCHEDULER_REJECTIONS
+from app.utils.stats import latency_summary_ms
+
+class SchedulerRejectedError(Exception):
+    """Raised when a request's class queue is full or its deadline passes."""
+
+    def __init__(self, workload: str, reason: str, retry_after: int):
+        super().__init__(f"{workload} request rejected: {reason}")
+        self.workload = workload
+        self.reason = reason
+        self.retry_after = retry_after
+
+class WorkloadClass:
+    """Limits and stats for one class of requests."""
+
+    def __init__(self, name: str, priority: int, max_concurrency: int, max_queue: int, deadline: float):
+        self.name = name
+        self.priority = priority
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.active = 0
+        self.queue: Deque[Tuple[asyncio.Future, float]] = deque()
+
+        # Stats
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.wait_times: Deque[float] = deque(maxlen=1000)
+
+class RequestScheduler:
+    """Admits requests per workload class under a shared concurrency cap.
+
+    Each class has its own concurrency limit, a bounded FIFO queue and a
+    queueing deadline. When a slot frees up, waiting classes are served in
+    priority order (lower number first), so cheap reads and searches get
+    ahead of queued generation. A full queue is rejected right away and a
+    request still queued at its deadline is dropped, so clients get a quick
+    503 instead of an answer after they've given up.
+    """
+
+    def __init__(self, classes: List[WorkloadClass], max_concurrency: int):
+        self.classes = {workload.name: workload for workload in classes}
+        self._by_priority = sorted(classes, key=lambda workload: workload.priority)
+        self.max_concurrency = max_concurrency
+        self._active = 0
+
+    async def acquire(self, name: str):
+        """Wait for a slot in ``name``'s class."""
+        workload = self.classes[name]
+        enqueued = time.perf_counter()
+
+        # Fast path: nothing queued ahead of us and capacity to spare
+        if not workload.queue and self._has_capacity(workload) and not self._higher_priority_waiting(workload):
+            self._admit(workload, enqueued)
+            return
+
+        if len(workload.queue) >= workload.max_queue:
+            workload.rejected += 1
+            raise SchedulerRejectedError(name, "queue full", retry_after=max(1, int(workload.deadline)))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (future, enqueued)
+        workload.queue.append(entry)
+
+        try:
+            done, _ = await asyncio.wait([future], timeout=workload.deadline)
+        except asyncio.CancelledError:
+            self._abandon(workload, entry)
+            raise
+
+        if not done:
+            self._abandon(workload, entry)
+            workload.expired += 1
+            raise SchedulerRejectedError(name, "deadline exceeded", retry_after=max(1, int(workload.deadline)))
+
+    def _abandon(self, workload: WorkloadClass, entry: Tuple[asyncio.Future, float]):
+        future, _ = entry
+        if future.done() and not future.cancelled():
+            # Admitted just as we gave up; hand the slot back
+            self.release(workload.name)
+            return
+        future.cancel()
+        try:
+            workload.queue.remove(entry)
+        except ValueError:
+            pass
+
+    def release(self, name: str):
+        """Free a slot and admit whoever is next."""
+        workload = self.classes[name]
+        workload.active -= 1
+        self._active -= 1
+        self._dispatch()
+
+    def _has_capacity(self, workload: WorkloadClass) -> bool:
+        return self._active < self.max_concurrency and workload.active < workload.max_concurrency
+
+    def _higher_priority_waiting(self, workload: WorkloadClass) -> bool:
+        return any(
+            other.queue and other.priority < workload.priority and self._has_capacity(other)
+            for other in self._by_priority
+        )
+
+    def _admit(self, workload: WorkloadClass, enqueued: float):
+        workload.active += 1
+        self._active += 1
+        workload.admitted += 1
+        workload.wait_times.append(time.perf_counter() - enqueued)
+
+    def _dispatch(self):
+        for workload in self._by_priority:
+            while workload.queue and self._has_capacity(workload):
+                future, enqueued = workload.queue.popleft()
+                if future.done():
+                    continue
+                self._admit(workload, enqueued)
+                future.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return occupancy, queue depth, rejections and queue wait per class."""
+        stats: Dict[str, Any] = {"active": self._active, "max_concurrency": self.max_concurrency, "classes": {}}
+
+        for workload in self._by_priority:
+            stats["classes"][workload.name] = {
+                "priority": workload.priority,
+                "active": workload.active,
+                "max_concurrency": workload.max_concurrency,
+                "queued": len(workload.queue),
+                "max_queue": workload.max_queue,
+                "deadline_s": workload.deadline,
+                "admitted": workload.admitted,
+                "rejected": workload.rejected,
+                "expired": workload.expired,
+                "wait_ms": latency_summary_ms(workload.wait_times)
+            }
+
+        return stats
+
+_scheduler: Optional[RequestScheduler] = None
+
+def get_scheduler() -> RequestScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RequestScheduler(
+            [
+                WorkloadClass("read", 0, settings.SCHEDULER_READ_CONCURRENCY,
+                              settings.SCHEDULER_READ_QUEUE_SIZE, settings.SCHEDULER_READ_DEADLINE),
+                WorkloadClass("search", 1, settings.SCHEDULER_SEARCH_CONCURRENCY,
+                              settings.SCHEDULER_SEARCH_QUEUE_SIZE, settings.SCHEDULER_SEARCH_DEADLINE),
+                WorkloadClass("generation", 2, settings.SCHEDULER_GENERATION_CONCURRENCY,
+                              settings.SCHEDULER_GENERATION_QUEUE_SIZE, settings.SCHEDULER_GENERATION_DEADLINE)
+            ],
+            max_concurrency=settings.SCHEDULER_MAX_CONCURRENCY
+        )
+    return _scheduler
+
+def add_scheduler(app: FastAPI):
+    """Add per-class admission control to the FastAPI application.
+
+    Requests are classified with ``SCHEDULER_ROUTE_CLASSES``; unmatched
+    routes (health checks) bypass the scheduler. The slot is held until the
+    handler returns, so a streamed body is bounded by the generation
+    executor's own queue rather than by the scheduler.
+    """
+    scheduler = get_scheduler()
+    rules = parse_route_rules(settings.SCHEDULER_ROUTE_CLASSES, str)
+
+    @app.middleware("http")
+    async def scheduler_middleware(request: Request, call_next):
+        name = match_route_rule(rules, request.method, request.url.path)
+        if name is None or name not in scheduler.classes:
+            return await call_next(request)
+
+        try:
+            await scheduler.acquire(name)
+        except SchedulerRejectedError as e:
+            SCHEDULER_REJECTIONS.inc(workload=e.workload, reason=e.reason)
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy. Please try again later."},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+
+        try:
+            return await call_next(request)
+        finally:
+            scheduler.release(name)
\ No newline at end of file
@@ -43,6 +43,7 @@ class SearchResult(BaseModel):
 class IdeaResponse(BaseModel):
     """Response model for idea generation."""
     ideas: List[Idea]
+    next_cursor: Optional[str] = None
 
 class SearchResponse(BaseModel):
     """Response model for search."""
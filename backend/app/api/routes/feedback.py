@@ -2,52 +2,48 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from app.api.models.request import FeedbackRequest
 from app.api.models.response import FeedbackResponse
-from app.db.session import get_db, DBSession
+from app.db.session import get_db, DBConnection
 
 router = APIRouter(prefix="/feedback", tags=["feedback"])
 
 @router.post("/", response_model=FeedbackResponse)
-async def submit_feedback(request: FeedbackRequest, db: DBSession = Depends(get_db)):
+def submit_feedback(request: FeedbackRequest, db: DBConnection = Depends(get_db)):
     """Submit feedback for an idea."""
     conn = db.get_postgres_connection()
     cursor = conn.cursor()
     
-    # Check if idea exists
-    cursor.execute("SELECT id FROM ideas WHERE id = %s", (request.idea_id,))
-    idea = cursor.fetchone()
-    
-    if not idea:
-        raise HTTPException(status_code=404, detail="Idea not found")
-    
-    # Insert feedback
+    # Bump the idea's running totals and insert the feedback in one statement;
+    # no row comes back when the idea doesn't exist
     cursor.execute(
         """
+        WITH idea AS (
+            UPDATE ideas
+            SET
+                rating_sum = rating_sum + %(rating)s,
+                feedback_count = feedback_count + 1,
+                avg_rating = (rating_sum + %(rating)s)::float / (feedback_count + 1)
+            WHERE id = %(idea_id)s
+            RETURNING id
+        )
         INSERT INTO feedback (idea_id, rating, feedback)
-        VALUES (%s, %s, %s)
+        SELECT id, %(rating)s, %(feedback)s FROM idea
         RETURNING id
         """,
-        (request.idea_id, request.rating, request.feedback)
+        {"idea_id": request.idea_id, "rating": request.rating, "feedback": request.feedback}
     )
-    feedback_id = cursor.fetchone()["id"]
+    row = cursor.fetchone()
     
-    # Update average rating and feedback count
-    cursor.execute(
-        """
-        UPDATE ideas
-        SET 
-            avg_rating = (SELECT AVG(rating) FROM feedback WHERE idea_id = %s),
-            feedback_count = (SELECT COUNT(*) FROM feedback WHERE idea_id = %s)
-        WHERE id = %s
-        """,
-        (request.idea_id, request.idea_id, request.idea_id)
-    )
+    if not row:
+        conn.rollback()
+        raise HTTPException(status_code=404, detail="Idea not found")
     
+    feedback_id = row["id"]
     conn.commit()
     
     return {"status": "Feedback submitted successfully", "feedback_id": feedback_id}
 
 @router.get("/{idea_id}", response_model=dict)
-async def get_feedback(idea_id: int, db: DBSession = Depends(get_db)):
+def get_feedback(idea_id: int, db: DBConnection = Depends(get_db)):
     """Get all feedback for a specific idea."""
     conn = db.get_postgres_connection()
     cursor = conn.cursor()
@@ -66,35 +62,38 @@ async def get_feedback(idea_id: int, db: DBSession = Depends(get_db)):
     return {"feedback": [dict(f) for f in feedback]}
 
 @router.delete("/{feedback_id}", response_model=dict)
-async def delete_feedback(feedback_id: int, db: DBSession = Depends(get_db)):
+def delete_feedback(feedback_id: int, db: DBConnection = Depends(get_db)):
     """Delete a specific feedback."""
     conn = db.get_postgres_connection()
     cursor = conn.cursor()
     
-    # Check if feedback exists
-    cursor.execute("SELECT idea_id FROM feedback WHERE id = %s", (feedback_id,))
-    feedback = cursor.fetchone()
-    
-    if not feedback:
-        raise HTTPException(status_code=404, detail="Feedback not found")
-    
-    idea_id = feedback["idea_id"]
-    
-    # Delete feedback
-    cursor.execute("DELETE FROM feedback WHERE id = %s", (feedback_id,))
-    
-    # Update average rating and feedback count
+    # Delete the feedback and take it out of the idea's running totals
     cursor.execute(
         """
+        WITH removed AS (
+            DELETE FROM feedback WHERE id = %s
+            RETURNING idea_id, rating
+        )
         UPDATE ideas
         SET 
-            avg_rating = COALESCE((SELECT AVG(rating) FROM feedback WHERE idea_id = %s), 0),
-            feedback_count = (SELECT COUNT(*) FROM feedback WHERE idea_id = %s)
-        WHERE id = %s
+            rating_sum = ideas.rating_sum - removed.rating,
+            feedback_count = ideas.feedback_count - 1,
+            avg_rating = CASE
+                WHEN ideas.feedback_count > 1
+                THEN (ideas.rating_sum - removed.rating)::float / (ideas.feedback_count - 1)
+                ELSE 0
+            END
+        FROM removed
+        WHERE ideas.id = removed.idea_id
+        RETURNING removed.idea_id
         """,
-        (idea_id, idea_id, idea_id)
+        (feedback_id,)
     )
     
+    if not cursor.fetchone():
+        conn.rollback()
+        raise HTTPException(status_code=404, detail="Feedback not found")
+    
     conn.commit()
     
     return {"status": "success", "message": "Feedback deleted successfully"}
\ No newline at end of file
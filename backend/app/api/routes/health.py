@@ -1,11 +1,145 @@
+import asyncio
 import time
+from typing import Dict, Optional
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 
+from app.api.middlewares.scheduler import get_scheduler
 from app.api.models.response import HealthResponse
+from app.core.config import settings
+from app.db.session import DBSession
+from app.ml.batcher import get_embedding_batcher
+from app.ml.embeddings import get_embedding_cache
+from app.ml.executor import get_inference_executor
+from app.ml.generator import get_generation_cache
+from app.ml.model import get_model_manager
+from app.rag.outbox import get_outbox_worker
+from app.rag.vector_store import get_vector_store
+from app.utils.probe import CachedProbe
 
 router = APIRouter(prefix="/health", tags=["health"])
 
+_probes: Optional[Dict[str, CachedProbe]] = None
+
+def get_dependency_probes() -> Dict[str, CachedProbe]:
+    """Cached reachability checks for the database and the vector store."""
+    global _probes
+    if _probes is None:
+        _probes = {
+            "database": CachedProbe("database", lambda: DBSession().get_postgres_pool().ping(),
+                                    settings.READINESS_PROBE_TTL),
+            "vector_store": CachedProbe("vector_store", lambda: get_vector_store().ping(),
+                                        settings.READINESS_PROBE_TTL)
+        }
+    return _probes
+
+def queue_saturation() -> Dict[str, float]:
+    """Fraction of each bounded queue in use, from 0 (idle) to 1 (rejecting)."""
+    saturation = {}
+    for name in ("embedding", "generation"):
+        stats = get_inference_executor(name).get_stats()
+        capacity = stats["max_workers"] + stats["max_queue_size"]
+        saturation[f"{name}_executor"] = (stats["in_flight"] + stats["queued"]) / capacity if capacity else 0.0
+
+    for name, workload in get_scheduler().get_stats()["classes"].items():
+        saturation[f"scheduler_{name}"] = workload["queued"] / workload["max_queue"] if workload["max_queue"] else 0.0
+    return saturation
+
 @router.get("/", response_model=HealthResponse)
 async def health_check():
     """Simple health check endpoint."""
-    return {"status": "ok", "timestamp": time.time()}
\ No newline at end of file
+    return {"status": "ok", "timestamp": time.time()}
+
+@router.get("/live", response_model=HealthResponse)
+async def liveness():
+    """Liveness probe: the process is up and serving its event loop.
+
+    Deliberately checks no dependencies, so a database outage doesn't get
+    every pod restarted.
+    """
+    return {"status": "ok", "timestamp": time.time()}
+
+@router.get("/ready")
+async def readiness():
+    """Readiness probe: 200 when this instance should receive traffic, 503 otherwise.
+
+    Not ready while models are still loading or failed to load, while the
+    database or vector store is unreachable, or while any inference or
+    scheduler queue is at least ``READINESS_MAX_SATURATION`` full.
+    Dependency checks are cached for ``READINESS_PROBE_TTL`` seconds.
+    """
+    manager = get_model_manager()
+    model_stats = manager.get_stats()
+
+    probes = get_dependency_probes()
+    results = await asyncio.gather(*(run_in_threadpool(probe.run) for probe in probes.values()))
+    dependencies = dict(zip(probes, results))
+
+    saturation = queue_saturation()
+
+    reasons = []
+    if not manager.is_ready():
+        reasons.append("models failed to load" if model_stats["preload_error"] else "models loading")
+    reasons.extend(f"{name} unreachable" for name, result in dependencies.items() if not result["ok"])
+    reasons.extend(
+        f"{name} saturated" for name, value in saturation.items()
+        if value >= settings.READINESS_MAX_SATURATION
+    )
+
+    return JSONResponse(
+        status_code=503 if reasons else 200,
+        content={
+            "status": "not_ready" if reasons else "ready",
+            "reasons": reasons,
+            "timestamp": time.time(),
+            "models": {
+                "ready": model_stats["ready"],
+                "preload_error": model_stats["preload_error"],
+                "loaded": [model["model"] for model in model_stats["models"]]
+            },
+            "dependencies": dependencies,
+            "saturation": saturation
+        }
+    )
+
+@router.get("/batcher", response_model=dict)
+async def batcher_stats():
+    """Embedding batcher queue depth, batch sizes and queue wait times."""
+    return get_embedding_batcher().get_stats()
+
+@router.get("/scheduler", response_model=dict)
+async def scheduler_stats():
+    """Per-class request concurrency, queue depth, rejections and queue waits."""
+    return get_scheduler().get_stats()
+
+@router.get("/executors", response_model=dict)
+async def executor_stats():
+    """Inference executor occupancy and rejections."""
+    return {
+        name: get_inference_executor(name).get_stats()
+        for name in ("embedding", "generation")
+    }
+
+@router.get("/models", response_model=dict)
+async def model_stats():
+    """Loaded models, their memory and whether preloading has finished."""
+    return get_model_manager().get_stats()
+
+@router.get("/db", response_model=dict)
+async def db_pool_stats():
+    """Postgres pool occupancy, waiters and checkout wait times."""
+    return DBSession().get_postgres_pool().get_stats()
+
+@router.get("/outbox", response_model=dict)
+async def outbox_stats():
+    """Index outbox backlog, dead rows, lag and drain counters."""
+    return await run_in_threadpool(get_outbox_worker().drainer.get_stats)
+
+@router.get("/caches", response_model=dict)
+async def cache_stats():
+    """Hit/miss counters and occupancy for in-process caches."""
+    return {
+        "embedding": get_embedding_cache().get_stats(),
+        "generation": get_generation_cache().get_stats()
+    }
\ No newline at end of file
@@ -1,19 +1,118 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
+import base64
+import json
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from psycopg2.extras import execute_values
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.api.models.request import IdeaRequest, IdeaWithCustomizationRequest
 from app.api.models.response import IdeaResponse, Idea
-from app.db.session import get_db, DBSession
-from app.ml.generator import generate_ideas
-from app.rag.indexer import DocumentIndexer
+from app.db.session import get_db, db_connection, DBConnection
+from app.ml.diversity import filter_generated_ideas, num_candidates_for
+from app.ml.executor import get_inference_executor
+from app.ml.generator import generate_ideas, generation_request_key, get_generation_cache, prepare_idea_stream
+from app.rag.outbox import enqueue_index_operations, get_outbox_worker
 
 router = APIRouter(prefix="/ideas", tags=["ideas"])
 
+# Columns returned for an idea; matches the Idea response model
+IDEA_COLUMNS = "id, title, description, topic, keywords, created_at, avg_rating, feedback_count"
+
+def _insert_ideas(db: DBConnection, ideas: List[Dict[str, str]], topic: str, keywords: List[str]) -> List[Dict[str, Any]]:
+    """Insert generated ideas and their outbox rows in one transaction and commit."""
+    if not ideas:
+        return []
+    
+    conn = db.get_postgres_connection()
+    cursor = conn.cursor()
+    
+    try:
+        stored_ideas = execute_values(
+            cursor,
+            f"""
+            INSERT INTO ideas (title, description, topic, keywords)
+            VALUES %s
+            RETURNING {IDEA_COLUMNS}
+            """,
+            [(idea["title"], idea["description"], topic, keywords) for idea in ideas],
+            page_size=len(ideas),
+            fetch=True
+        )
+        
+        # Queue RAG indexing with the write so it can't be lost
+        enqueue_index_operations(cursor, "index", [stored_idea["id"] for stored_idea in stored_ideas])
+        
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    
+    return [dict(stored_idea) for stored_idea in stored_ideas]
+
 @router.post("/", response_model=IdeaResponse)
-async def create_ideas(request: IdeaWithCustomizationRequest, db: DBSession = Depends(get_db)):
-    """Generate creative ideas based on input parameters."""
-    # Generate ideas
-    ideas = generate_ideas(
+async def create_ideas(
+    request: IdeaWithCustomizationRequest,
+    cache_control: Optional[str] = Header(None),
+    x_cache_bypass: Optional[str] = Header(None)
+):
+    """Generate creative ideas based on input parameters.
+    
+    Deterministic requests (low ``creativity`` or a fixed ``seed``) are
+    answered from the generation cache with the ideas the first such
+    request stored, without generating or inserting again.
+    ``Cache-Control: no-cache`` or ``X-Cache-Bypass: 1`` skips the cache.
+    """
+    bypass_cache = "no-cache" in (cache_control or "").lower() or (x_cache_bypass or "").lower() in ("1", "true", "yes")
+    customization = request.customization.dict() if request.customization else None
+    
+    cache_key = None
+    if not bypass_cache:
+        cache_key = generation_request_key(
+            request.topic, request.keywords, request.contexts, request.num_ideas,
+            request.creativity, request.max_length, customization
+        )
+    if cache_key is not None:
+        cached = await run_in_threadpool(get_generation_cache().get, cache_key)
+        if cached is not None:
+            return {"ideas": cached}
+    
+    # Generate ideas on the generation executor so the event loop stays free
+    ideas = await get_inference_executor("generation").run(
+        generate_ideas,
+        topic=request.topic,
+        keywords=request.keywords,
+        contexts=request.contexts,
+        num_ideas=num_candidates_for(request.num_ideas),
+        creativity=request.creativity,
+        max_length=request.max_length,
+        customization=customization
+    )
+    
+    # Drop near-duplicates and keep a diverse set of the requested size
+    ideas = await filter_generated_ideas(ideas, request.num_ideas, request.topic, request.keywords)
+    
+    stored_ideas = await _store_ideas(ideas, request.topic, request.keywords)
+    
+    # Cache the stored rows, after dedup, so a repeat neither re-inserts
+    # them nor has them deduplicated away against their own index entries
+    if cache_key is not None and stored_ideas:
+        await run_in_threadpool(get_generation_cache().set, cache_key, jsonable_encoder(stored_ideas))
+    
+    return {"ideas": stored_ideas}
+
+@router.post("/stream")
+async def stream_ideas(request: IdeaWithCustomizationRequest):
+    """Generate ideas and stream each one as NDJSON as soon as it is produced.
+    
+    Emits ``{"event": "idea", ...}`` lines while generating, then stores and
+    indexes the ideas and finishes with ``{"event": "complete", "ideas": [...]}``
+    carrying the stored rows.
+    """
+    stream = await run_in_threadpool(
+        prepare_idea_stream,
         topic=request.topic,
         keywords=request.keywords,
         contexts=request.contexts,
@@ -23,53 +122,57 @@ async def create_ideas(request: IdeaWithCustomizationRequest, db: DBSession = De
         customization=request.customization.dict() if request.customization else None
     )
     
-    # Store ideas in PostgreSQL
-    conn = db.get_postgres_connection()
-    cursor = conn.cursor()
+    # Admit before replying so a full queue still yields a 503
+    generation = get_inference_executor("generation").submit(stream.generate)
     
-    stored_ideas = []
-    indexer = DocumentIndexer()
+    async def event_stream():
+        ideas = []
+        try:
+            async for idea in iterate_in_threadpool(iter(stream)):
+                ideas.append(idea)
+                yield json.dumps({"event": "idea", "index": len(ideas) - 1, "idea": idea}) + "\n"
+            await generation
+            
+            stored_ideas = await _store_ideas(ideas, request.topic, request.keywords)
+            yield json.dumps({"event": "complete", "ideas": jsonable_encoder(stored_ideas)}) + "\n"
+        except Exception as e:
+            print(f"Error streaming ideas: {e}")
+            yield json.dumps({"event": "error", "detail": "Idea generation failed"}) + "\n"
     
-    for idea in ideas:
-        cursor.execute(
-            """
-            INSERT INTO ideas (title, description, topic, keywords)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id, title, description, topic, keywords, created_at, avg_rating, feedback_count
-            """,
-            (idea["title"], idea["description"], request.topic, request.keywords)
-        )
-        stored_idea = cursor.fetchone()
-        stored_ideas.append(dict(stored_idea))
-        
-        # Index for RAG
-        indexer.index_document(
-            idea_id=stored_idea["id"],
-            title=idea["title"],
-            content=idea["description"],
-            metadata={
-                "topic": request.topic,
-                "keywords": request.keywords
-            }
-        )
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+async def _store_ideas(ideas: List[Dict[str, str]], topic: str, keywords: List[str]) -> List[Dict[str, Any]]:
+    """Store ideas in PostgreSQL and queue them for RAG indexing.
     
-    conn.commit()
+    Returns as soon as the ideas are committed; the outbox worker embeds and
+    indexes them shortly after, retrying if the vector store is unavailable.
+    """
+    async with db_connection() as db:
+        stored_ideas = await run_in_threadpool(_insert_ideas, db, ideas, topic, keywords)
     
-    return {"ideas": stored_ideas}
+    get_outbox_worker().notify()
+    
+    return stored_ideas
 
 @router.get("/", response_model=IdeaResponse)
-async def get_ideas(
-    skip: int = 0, 
-    limit: int = 10, 
+def get_ideas(
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    skip: int = 0,
     topic: Optional[str] = None, 
     min_rating: Optional[float] = None,
-    db: DBSession = Depends(get_db)
+    db: DBConnection = Depends(get_db)
 ):
-    """Get ideas with optional filtering."""
+    """Get ideas with optional filtering, newest first.
+    
+    Pass the returned ``next_cursor`` back as ``cursor`` to get the next
+    page; it is null on the last page. Paging by ``cursor`` costs the same
+    at any depth, while ``skip`` still works but scans every skipped row.
+    """
     conn = db.get_postgres_connection()
-    cursor = conn.cursor()
+    db_cursor = conn.cursor()
     
-    query = "SELECT * FROM ideas WHERE 1=1"
+    query = f"SELECT {IDEA_COLUMNS} FROM ideas WHERE 1=1"
     params = []
     
     if topic:
@@ -80,21 +183,49 @@ async def get_ideas(
         query += " AND avg_rating >= %s"
         params.append(min_rating)
     
-    query += " ORDER BY created_at DESC LIMIT %s OFFSET %s"
-    params.extend([limit, skip])
+    if cursor:
+        created_at, last_id = _decode_cursor(cursor)
+        query += " AND (created_at, id) < (%s, %s)"
+        params.extend([created_at, last_id])
+    
+    # One extra row tells us whether there is a next page
+    query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+    params.append(limit + 1)
+    
+    if skip and not cursor:
+        query += " OFFSET %s"
+        params.append(skip)
     
-    cursor.execute(query, params)
-    ideas = cursor.fetchall()
+    db_cursor.execute(query, params)
+    ideas = db_cursor.fetchall()
     
-    return {"ideas": [dict(idea) for idea in ideas]}
+    next_cursor = None
+    if len(ideas) > limit:
+        ideas = ideas[:limit]
+        next_cursor = _encode_cursor(ideas[-1]["created_at"], ideas[-1]["id"])
+    
+    return {"ideas": [dict(idea) for idea in ideas], "next_cursor": next_cursor}
+
+def _encode_cursor(created_at: datetime, idea_id: int) -> str:
+    """Opaque page cursor: the (created_at, id) of the last idea returned."""
+    payload = json.dumps({"created_at": created_at.isoformat(), "id": idea_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["created_at"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/{idea_id}", response_model=dict)
-async def get_idea(idea_id: int, db: DBSession = Depends(get_db)):
+def get_idea(idea_id: int, db: DBConnection = Depends(get_db)):
     """Get a specific idea by ID with its feedback."""
     conn = db.get_postgres_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT * FROM ideas WHERE id = %s", (idea_id,))
+    cursor.execute(f"SELECT {IDEA_COLUMNS} FROM ideas WHERE id = %s", (idea_id,))
     idea = cursor.fetchone()
     
     if not idea:
@@ -110,30 +241,29 @@ async def get_idea(idea_id: int, db: DBSession = Depends(get_db)):
     }
 
 @router.delete("/{idea_id}", response_model=dict)
-async def delete_idea(idea_id: int, db: DBSession = Depends(get_db)):
+def delete_idea(idea_id: int, db: DBConnection = Depends(get_db)):
     """Delete an idea and its associated data."""
     conn = db.get_postgres_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT * FROM ideas WHERE id = %s", (idea_id,))
+    cursor.execute("SELECT id FROM ideas WHERE id = %s", (idea_id,))
     idea = cursor.fetchone()
     
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
     
-    # Delete from PostgreSQL (cascade will delete feedback)
+    # Delete from PostgreSQL (cascade will delete feedback) and queue the
+    # vector removal in the same transaction
     cursor.execute("DELETE FROM ideas WHERE id = %s", (idea_id,))
-    
-    # Delete from Vector DB
-    indexer = DocumentIndexer()
-    indexer.delete_document(idea_id)
-    
+    enqueue_index_operations(cursor, "delete", [idea_id])
     conn.commit()
     
+    get_outbox_worker().notify()
+    
     return {"status": "success", "message": "Idea deleted successfully"}
 
 @router.get("/topics", response_model=dict)
-async def get_topics(db: DBSession = Depends(get_db)):
+def get_topics(db: DBConnection = Depends(get_db)):
     """Get all unique topics."""
     conn = db.get_postgres_connection()
     cursor = conn.cursor()
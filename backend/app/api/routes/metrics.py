@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.api.middlewares.scheduler import get_scheduler
+from app.core.metrics import DB_POOL_CONNECTIONS, QUEUE_DEPTH, REGISTRY
+from app.db.session import DBSession
+from app.ml.batcher import get_embedding_batcher
+from app.ml.executor import get_inference_executor
+
+router = APIRouter(tags=["metrics"])
+
+def _collect_gauges():
+    """Sample queue depths and pool occupancy; these are cheap to read at scrape time."""
+    QUEUE_DEPTH.set(get_embedding_batcher().get_stats()["queue_depth"], queue="embedding_batcher")
+
+    for name in ("embedding", "generation"):
+        QUEUE_DEPTH.set(get_inference_executor(name).get_stats()["queued"], queue=f"{name}_executor")
+
+    for name, workload in get_scheduler().get_stats()["classes"].items():
+        QUEUE_DEPTH.set(workload["queued"], queue=f"scheduler_{name}")
+
+    pool_stats = DBSession().get_postgres_pool().get_stats()
+    for state in ("in_use", "idle", "waiting"):
+        DB_POOL_CONNECTIONS.set(pool_stats[state], state=state)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics in the text exposition format."""
+    _collect_gauges()
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
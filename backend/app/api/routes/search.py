@@ -1,54 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional, Dict, Any
 
 from app.api.models.request import SearchRequest
 from app.api.models.response import SearchResponse
-from app.db.session import get_db, DBSession
+from app.db.session import db_connection, DBConnection
+from app.ml.batcher import get_embedding_batcher
 from app.rag.retriever import DocumentRetriever
 
 router = APIRouter(prefix="/search", tags=["search"])
 
+def _attach_idea_details(db: DBConnection, results: List[Dict[str, Any]]):
+    """Fill in title, topic and keywords from PostgreSQL."""
+    conn = db.get_postgres_connection()
+    cursor = conn.cursor()
+    
+    idea_ids = [result["idea_id"] for result in results]
+    placeholder = ", ".join(["%s"] * len(idea_ids))
+    
+    cursor.execute(
+        f"""
+        SELECT id, title, description, topic, keywords, avg_rating, feedback_count
+        FROM ideas 
+        WHERE id IN ({placeholder})
+        """,
+        idea_ids
+    )
+    
+    idea_details = cursor.fetchall()
+    
+    # Map idea details to results
+    id_to_details = {item["id"]: item for item in idea_details}
+    
+    for result in results:
+        idea_id = result["idea_id"]
+        if idea_id in id_to_details:
+            details = id_to_details[idea_id]
+            result["title"] = details["title"]
+            result["topic"] = details["topic"]
+            result["keywords"] = details["keywords"]
+
+def _get_idea(db: DBConnection, idea_id: int) -> Optional[Dict[str, Any]]:
+    conn = db.get_postgres_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT id, title, description FROM ideas WHERE id = %s", (idea_id,))
+    return cursor.fetchone()
+
 @router.post("/", response_model=SearchResponse)
-async def search_ideas(request: SearchRequest, db: DBSession = Depends(get_db)):
+async def search_ideas(request: SearchRequest):
     """Search for ideas based on semantic similarity."""
+    # Embed the query alongside other in-flight requests
+    query_embedding = await get_embedding_batcher().embed(request.query)
+    
     # Perform semantic search
     retriever = DocumentRetriever()
-    results = retriever.search(
+    results = await run_in_threadpool(
+        retriever.search,
         query=request.query,
         top_k=request.num_results,
         similarity_threshold=request.similarity_threshold,
-        filters=request.filters
+        filters=request.filters,
+        query_embedding=query_embedding
     )
     
     # Fetch additional details if needed
     if results:
-        conn = db.get_postgres_connection()
-        cursor = conn.cursor()
-        
-        idea_ids = [result["idea_id"] for result in results]
-        placeholder = ", ".join(["%s"] * len(idea_ids))
-        
-        cursor.execute(
-            f"""
-            SELECT id, title, description, topic, keywords, avg_rating, feedback_count
-            FROM ideas 
-            WHERE id IN ({placeholder})
-            """,
-            idea_ids
-        )
-        
-        idea_details = cursor.fetchall()
-        
-        # Map idea details to results
-        id_to_details = {item["id"]: item for item in idea_details}
-        
-        for result in results:
-            idea_id = result["idea_id"]
-            if idea_id in id_to_details:
-                details = id_to_details[idea_id]
-                result["title"] = details["title"]
-                result["topic"] = details["topic"]
-                result["keywords"] = details["keywords"]
+        async with db_connection() as db:
+            await run_in_threadpool(_attach_idea_details, db, results)
     
     return {"results": results}
 
@@ -56,16 +75,12 @@ async def search_ideas(request: SearchRequest, db: DBSession = Depends(get_db)):
 async def find_similar_ideas(
     idea_id: int, 
     top_k: int = 5, 
-    similarity_threshold: float = 0.7,
-    db: DBSession = Depends(get_db)
+    similarity_threshold: float = 0.7
 ):
     """Find ideas similar to a specific idea."""
     # First get the idea
-    conn = db.get_postgres_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM ideas WHERE id = %s", (idea_id,))
-    idea = cursor.fetchone()
+    async with db_connection() as db:
+        idea = await run_in_threadpool(_get_idea, db, idea_id)
     
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
@@ -73,12 +88,19 @@ async def find_similar_ideas(
     # Use the idea as the query
     query = f"{idea['title']} {idea['description']}"
     
-    # Perform search
+    # Reuse the vector stored at index time, embedding only if it is missing
     retriever = DocumentRetriever()
-    results = retriever.search(
+    query_embedding = await run_in_threadpool(retriever.get_document_embedding, idea_id)
+    if query_embedding is None:
+        query_embedding = await get_embedding_batcher().embed(query)
+    
+    # Perform search
+    results = await run_in_threadpool(
+        retriever.search,
         query=query,
         top_k=top_k + 1,  # +1 because the idea itself will be included
-        similarity_threshold=similarity_threshold
+        similarity_threshold=similarity_threshold,
+        query_embedding=query_embedding
     )
     
     # Filter out the original idea
@@ -25,23 +25,124 @@ class Settings(BaseSettings):
     NEON_DB_URL: str = os.getenv("NEON_DB_URL", "")
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_CHECK_IDLE: float = float(os.getenv("DB_POOL_CHECK_IDLE", "30"))
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    
+    # Vector store configuration ("supabase" or "local"; local needs LOCAL_INDEX_PATH)
+    VECTOR_STORE_BACKEND: str = os.getenv("VECTOR_STORE_BACKEND", "supabase")
+    LOCAL_INDEX_ANN_THRESHOLD: int = int(os.getenv("LOCAL_INDEX_ANN_THRESHOLD", "50000"))
+    LOCAL_INDEX_HNSW_M: int = int(os.getenv("LOCAL_INDEX_HNSW_M", "16"))
+    LOCAL_INDEX_HNSW_EF_CONSTRUCTION: int = int(os.getenv("LOCAL_INDEX_HNSW_EF_CONSTRUCTION", "200"))
+    LOCAL_INDEX_HNSW_EF_SEARCH: int = int(os.getenv("LOCAL_INDEX_HNSW_EF_SEARCH", "64"))
+    LOCAL_INDEX_PATH: str = os.getenv("LOCAL_INDEX_PATH", "")
+    LOCAL_INDEX_COMPACT_INTERVAL: int = int(os.getenv("LOCAL_INDEX_COMPACT_INTERVAL", "300"))
+    LOCAL_INDEX_COMPACT_RATIO: float = float(os.getenv("LOCAL_INDEX_COMPACT_RATIO", "0.2"))
+    
+    # Vector indexing outbox
+    OUTBOX_WORKER_ENABLED: bool = os.getenv("OUTBOX_WORKER_ENABLED", "True").lower() == "true"
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "64"))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+    OUTBOX_BACKOFF_BASE: float = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+    OUTBOX_BACKOFF_MAX: float = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
     
     # Rate limiting configuration
     RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", "60"))
     RATE_LIMIT_WINDOW: int = int(os.getenv("RATE_LIMIT_WINDOW", "60"))
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "local")
+    RATE_LIMIT_SQLITE_PATH: str = os.getenv("RATE_LIMIT_SQLITE_PATH", "/tmp/ideaai-rate-limit.sqlite3")
+    RATE_LIMIT_IDLE_TTL: int = int(os.getenv("RATE_LIMIT_IDLE_TTL", "300"))
+    RATE_LIMIT_ROUTE_COSTS: str = os.getenv(
+        "RATE_LIMIT_ROUTE_COSTS",
+        "POST /ideas=10,POST /search=2,/health=0,/metrics=0"
+    )
+    
+    # Request scheduling per workload class (deadlines in seconds)
+    SCHEDULER_MAX_CONCURRENCY: int = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "64"))
+    SCHEDULER_ROUTE_CLASSES: str = os.getenv(
+        "SCHEDULER_ROUTE_CLASSES",
+        "POST /ideas=generation,/search=search,/ideas=read,/feedback=read"
+    )
+    SCHEDULER_READ_CONCURRENCY: int = int(os.getenv("SCHEDULER_READ_CONCURRENCY", "32"))
+    SCHEDULER_READ_QUEUE_SIZE: int = int(os.getenv("SCHEDULER_READ_QUEUE_SIZE", "256"))
+    SCHEDULER_READ_DEADLINE: float = float(os.getenv("SCHEDULER_READ_DEADLINE", "2"))
+    SCHEDULER_SEARCH_CONCURRENCY: int = int(os.getenv("SCHEDULER_SEARCH_CONCURRENCY", "16"))
+    SCHEDULER_SEARCH_QUEUE_SIZE: int = int(os.getenv("SCHEDULER_SEARCH_QUEUE_SIZE", "64"))
+    SCHEDULER_SEARCH_DEADLINE: float = float(os.getenv("SCHEDULER_SEARCH_DEADLINE", "5"))
+    SCHEDULER_GENERATION_CONCURRENCY: int = int(os.getenv("SCHEDULER_GENERATION_CONCURRENCY", "4"))
+    SCHEDULER_GENERATION_QUEUE_SIZE: int = int(os.getenv("SCHEDULER_GENERATION_QUEUE_SIZE", "16"))
+    SCHEDULER_GENERATION_DEADLINE: float = float(os.getenv("SCHEDULER_GENERATION_DEADLINE", "30"))
+    
+    # Readiness probes: seconds a dependency check is reused, and the queue
+    # saturation (0-1) at which the instance reports itself not ready
+    READINESS_PROBE_TTL: float = float(os.getenv("READINESS_PROBE_TTL", "5"))
+    READINESS_MAX_SATURATION: float = float(os.getenv("READINESS_MAX_SATURATION", "0.9"))
     
     # ML Model configurations
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     EMBEDDING_DIMENSION: int = int(os.getenv("EMBEDDING_DIMENSION", "384"))
     GENERATION_MODEL: str = os.getenv("GENERATION_MODEL", "google/flan-t5-base")
     
+    # Embedding batching parameters
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    EMBEDDING_MAX_LENGTH: int = int(os.getenv("EMBEDDING_MAX_LENGTH", "512"))
+    EMBEDDING_NORMALIZE: bool = os.getenv("EMBEDDING_NORMALIZE", "True").lower() == "true"
+    SIMILARITY_MAX_BYTES: int = int(os.getenv("SIMILARITY_MAX_BYTES", str(64 * 1024 * 1024)))
+    
+    # Cross-request embedding batcher
+    EMBEDDING_BATCHER_MAX_SIZE: int = int(os.getenv("EMBEDDING_BATCHER_MAX_SIZE", "32"))
+    EMBEDDING_BATCHER_WINDOW_MS: float = float(os.getenv("EMBEDDING_BATCHER_WINDOW_MS", "5"))
+    
+    # Inference executors (worker threads and queued jobs per workload)
+    EMBEDDING_EXECUTOR_WORKERS: int = int(os.getenv("EMBEDDING_EXECUTOR_WORKERS", "1"))
+    EMBEDDING_EXECUTOR_QUEUE_SIZE: int = int(os.getenv("EMBEDDING_EXECUTOR_QUEUE_SIZE", "64"))
+    GENERATION_EXECUTOR_WORKERS: int = int(os.getenv("GENERATION_EXECUTOR_WORKERS", "1"))
+    GENERATION_EXECUTOR_QUEUE_SIZE: int = int(os.getenv("GENERATION_EXECUTOR_QUEUE_SIZE", "8"))
+    INFERENCE_RETRY_AFTER: int = int(os.getenv("INFERENCE_RETRY_AFTER", "5"))
+    
     # Default generation parameters
     DEFAULT_MAX_LENGTH: int = int(os.getenv("DEFAULT_MAX_LENGTH", "200"))
     DEFAULT_NUM_IDEAS: int = int(os.getenv("DEFAULT_NUM_IDEAS", "5"))
     DEFAULT_CREATIVITY: float = float(os.getenv("DEFAULT_CREATIVITY", "0.7"))
     
+    # "multi_sequence" samples one idea per returned sequence in a single
+    # generate call; "single" splits one generated text on blank lines
+    GENERATION_MODE: str = os.getenv("GENERATION_MODE", "multi_sequence")
+    GENERATION_MAX_ATTEMPTS: int = int(os.getenv("GENERATION_MAX_ATTEMPTS", "3"))
+    GENERATION_STREAM_TIMEOUT: float = float(os.getenv("GENERATION_STREAM_TIMEOUT", "60"))
+    
+    # Post-generation semantic dedup and diversity selection
+    IDEA_DEDUP_ENABLED: bool = os.getenv("IDEA_DEDUP_ENABLED", "True").lower() == "true"
+    IDEA_DEDUP_THRESHOLD: float = float(os.getenv("IDEA_DEDUP_THRESHOLD", "0.9"))
+    # Candidates at or above this are never used to top up a short result
+    IDEA_DEDUP_EXACT_THRESHOLD: float = float(os.getenv("IDEA_DEDUP_EXACT_THRESHOLD", "0.98"))
+    IDEA_MMR_LAMBDA: float = float(os.getenv("IDEA_MMR_LAMBDA", "0.7"))
+    IDEA_CANDIDATE_OVERSAMPLE: float = float(os.getenv("IDEA_CANDIDATE_OVERSAMPLE", "1.5"))
+    
     # Cache settings
     MODEL_CACHE_SIZE: int = int(os.getenv("MODEL_CACHE_SIZE", "2"))
+    MODEL_MEMORY_BUDGET_MB: int = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+    MODEL_PRELOAD: str = os.getenv("MODEL_PRELOAD", "embedding,generation")
+    MODEL_WARMUP: bool = os.getenv("MODEL_WARMUP", "True").lower() == "true"
+    TORCH_NUM_THREADS: int = int(os.getenv("TORCH_NUM_THREADS", "0"))
+    TORCH_NUM_INTEROP_THREADS: int = int(os.getenv("TORCH_NUM_INTEROP_THREADS", "0"))
+    INFERENCE_BACKEND: str = os.getenv("INFERENCE_BACKEND", "pytorch")
+    INFERENCE_ONNX_DIR: str = os.getenv("INFERENCE_ONNX_DIR", "")
+    INFERENCE_PARITY_CHECK: bool = os.getenv("INFERENCE_PARITY_CHECK", "True").lower() == "true"
+    INFERENCE_PARITY_MIN_COSINE: float = float(os.getenv("INFERENCE_PARITY_MIN_COSINE", "0.99"))
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+    EMBEDDING_CACHE_TTL: int = int(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
+    EMBEDDING_CACHE_MAX_BYTES: int = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    EMBEDDING_CACHE_SHARED_PATH: str = os.getenv("EMBEDDING_CACHE_SHARED_PATH", "")
+    EMBEDDING_CACHE_SHARED_MAX_ROWS: int = int(os.getenv("EMBEDDING_CACHE_SHARED_MAX_ROWS", "100000"))
+    GENERATION_CACHE_SIZE: int = int(os.getenv("GENERATION_CACHE_SIZE", "1000"))
+    GENERATION_CACHE_TTL: int = int(os.getenv("GENERATION_CACHE_TTL", "86400"))
+    GENERATION_CACHE_MAX_CREATIVITY: float = float(os.getenv("GENERATION_CACHE_MAX_CREATIVITY", "0.2"))
+    GENERATION_CACHE_SHARED_PATH: str = os.getenv("GENERATION_CACHE_SHARED_PATH", "")
+    GENERATION_CACHE_SHARED_MAX_ROWS: int = int(os.getenv("GENERATION_CACHE_SHARED_MAX_ROWS", "10000"))
     
     class Config:
         case_sensitive = True
@@ -0,0 +1,36 @@
+from typing import List, Optional
+
+def repair_rating_aggregates(cursor, idea_ids: Optional[List[int]] = None) -> int:
+    """Re-derive rating_sum, feedback_count and avg_rating from the feedback table.
+
+    Feedback writes keep these columns up to date incrementally; this fixes
+    any drift (manual edits, rows added before the columns existed). Only
+    ideas whose stored values differ are written. Returns how many were
+    repaired; the caller commits.
+    """
+    id_filter = "WHERE i.id = ANY(%s)" if idea_ids is not None else ""
+    params = (list(idea_ids),) if idea_ids is not None else ()
+
+    cursor.execute(
+        f"""
+        UPDATE ideas
+        SET rating_sum = agg.rating_sum,
+            feedback_count = agg.feedback_count,
+            avg_rating = agg.avg_rating
+        FROM (
+            SELECT i.id,
+                   COALESCE(SUM(f.rating), 0) AS rating_sum,
+                   COUNT(f.id) AS feedback_count,
+                   COALESCE(AVG(f.rating), 0) AS avg_rating
+            FROM ideas i
+            LEFT JOIN feedback f ON f.idea_id = i.id
+            {id_filter}
+            GROUP BY i.id
+        ) agg
+        WHERE ideas.id = agg.id
+          AND (ideas.rating_sum, ideas.feedback_count, ideas.avg_rating)
+              IS DISTINCT FROM (agg.rating_sum, agg.feedback_count, agg.avg_rating)
+        """,
+        params
+    )
+    return cursor.rowcount
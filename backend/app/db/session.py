@@ -1,9 +1,196 @@
 import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator
+
 import psycopg2
+from psycopg2 import extensions, pool
 from psycopg2.extras import RealDictCursor
+from fastapi.concurrency import run_in_threadpool
 from supabase import create_client, Client
 
 from app.core.config import settings
+from app.core.metrics import time_stage
+from app.db.ratings import repair_rating_aggregates
+from app.utils.stats import latency_summary_ms
+
+class PoolTimeoutError(Exception):
+    """Raised when no Postgres connection frees up within ``DB_POOL_TIMEOUT``."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Timed out waiting for a database connection")
+        self.retry_after = retry_after
+
+class TimedCursor(RealDictCursor):
+    """RealDictCursor that records each query under the ``db_query`` stage."""
+
+    def execute(self, query, vars=None):
+        with time_stage("db_query"):
+            return super().execute(query, vars)
+
+class PostgresPool:
+    """Bounded psycopg2 connection pool with blocking checkout.
+
+    Callers wait up to ``timeout`` seconds for a free connection instead of
+    failing as soon as ``max_size`` are in use. Every connection gets the
+    configured ``statement_timeout``. A connection idle for longer than
+    ``check_idle`` seconds is pinged before it is handed out and replaced if
+    the ping fails. On release, any open or failed transaction is rolled
+    back so one request's error never leaks into the next.
+    """
+
+    def __init__(self, dsn: str, min_size: int, max_size: int, timeout: float,
+                 statement_timeout_ms: int, check_idle: float):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.statement_timeout_ms = statement_timeout_ms
+        self.check_idle = check_idle
+
+        self._pool = pool.ThreadedConnectionPool(min_size, max_size, dsn, cursor_factory=TimedCursor)
+        # psycopg2 closes released connections once ``minconn`` are idle; open
+        # only ``min_size`` up front but keep every released one for reuse
+        self._pool.minconn = max_size
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        # Keyed on the connection itself: id() values are reused once a connection is freed
+        self._last_used: "weakref.WeakKeyDictionary[Any, float]" = weakref.WeakKeyDictionary()
+
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._health_check_failures = 0
+        self._wait_times = deque(maxlen=1000)
+
+    def checkout(self):
+        """Get a healthy connection, waiting for one to be released if needed."""
+        start = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        acquired = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self._waiting -= 1
+            if not acquired:
+                self._timeouts += 1
+        if not acquired:
+            raise PoolTimeoutError(retry_after=max(1, int(self.timeout)))
+
+        try:
+            conn = self._get_healthy_connection()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_times.append(time.perf_counter() - start)
+        return conn
+
+    def _get_healthy_connection(self):
+        # Bounded by the pool size: every stale connection is closed on the way
+        for _ in range(self.max_size + 1):
+            conn = self._pool.getconn()
+            last_used = self._last_used.get(conn)
+
+            if last_used is None:
+                try:
+                    self._configure(conn)
+                except Exception:
+                    # Don't leak the pool slot of a connection we can't use
+                    self._discard(conn)
+                    raise
+                return conn
+            if conn.closed:
+                self._discard(conn)
+                continue
+            if time.monotonic() - last_used < self.check_idle:
+                return conn
+
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+                return conn
+            except psycopg2.Error as e:
+                print(f"Discarding unhealthy database connection: {e}")
+                with self._lock:
+                    self._health_check_failures += 1
+                self._discard(conn)
+
+        raise psycopg2.OperationalError("Could not get a healthy database connection")
+
+    def _configure(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SET statement_timeout = %s", (self.statement_timeout_ms,))
+        conn.commit()
+        self._last_used[conn] = time.monotonic()
+
+    def _discard(self, conn):
+        self._last_used.pop(conn, None)
+        self._pool.putconn(conn, close=True)
+
+    def release(self, conn):
+        """Return a connection, rolling back anything left uncommitted."""
+        try:
+            if conn.closed:
+                self._discard(conn)
+                return
+
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                self._discard(conn)
+                return
+
+            self._last_used[conn] = time.monotonic()
+            self._pool.putconn(conn)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check out a connection for the duration of a ``with`` block."""
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def ping(self):
+        """Check out a connection and run ``SELECT 1``; raises if the database is unreachable."""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+
+    def close(self):
+        self._pool.closeall()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return occupancy, waiters, timeouts and checkout wait times."""
+        with self._lock:
+            in_use = self._in_use
+
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": in_use,
+                "idle": len(self._pool._pool),
+                "waiting": self._waiting,
+                "saturation": in_use / self.max_size if self.max_size else 0.0,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "health_check_failures": self._health_check_failures,
+                "wait_ms": latency_summary_ms(self._wait_times)
+            }
 
 class DBSession:
     _instance = None
@@ -15,13 +202,22 @@ class DBSession:
         return cls._instance
     
     def _initialize(self):
-        self._pg_conn = None
+        self._pg_pool = None
+        self._pool_lock = threading.Lock()
         self._supabase_client = None
     
-    def get_postgres_connection(self):
-        if self._pg_conn is None or self._pg_conn.closed:
-            self._pg_conn = psycopg2.connect(settings.NEON_DB_URL, cursor_factory=RealDictCursor)
-        return self._pg_conn
+    def get_postgres_pool(self) -> PostgresPool:
+        with self._pool_lock:
+            if self._pg_pool is None:
+                self._pg_pool = PostgresPool(
+                    settings.NEON_DB_URL,
+                    min_size=settings.DB_POOL_MIN_SIZE,
+                    max_size=settings.DB_POOL_MAX_SIZE,
+                    timeout=settings.DB_POOL_TIMEOUT,
+                    statement_timeout_ms=settings.DB_STATEMENT_TIMEOUT_MS,
+                    check_idle=settings.DB_POOL_CHECK_IDLE
+                )
+            return self._pg_pool
     
     def get_supabase_client(self) -> Client:
         if self._supabase_client is None:
@@ -29,16 +225,39 @@ class DBSession:
         return self._supabase_client
     
     def close(self):
-        if self._pg_conn and not self._pg_conn.closed:
-            self._pg_conn.close()
-            self._pg_conn = None
+        if self._pg_pool is not None:
+            self._pg_pool.close()
+            self._pg_pool = None
+
+class DBConnection:
+    """Database handle for one request: a pooled Postgres connection plus
+    the shared Supabase client."""
+    
+    def __init__(self, conn):
+        self._conn = conn
+    
+    def get_postgres_connection(self):
+        return self._conn
+    
+    def get_supabase_client(self) -> Client:
+        return DBSession().get_supabase_client()
 
 async def initialize_db():
     """Initialize database tables and extensions."""
-    db_session = DBSession()
-    conn = db_session.get_postgres_connection()
+    with DBSession().get_postgres_pool().connection() as conn:
+        _create_tables(conn)
+    
+    print("Database initialized")
+
+# Advisory lock key serialising schema setup across workers starting together
+SCHEMA_LOCK_KEY = 0x1DEA
+
+def _create_tables(conn):
     cursor = conn.cursor()
     
+    # Held until commit, so a second worker sees the finished schema
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_KEY,))
+    
     # Create PostgreSQL tables if they don't exist
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS ideas (
@@ -63,14 +282,55 @@ async def initialize_db():
     )
     """)
     
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS index_outbox (
+        id BIGSERIAL PRIMARY KEY,
+        idea_id INTEGER NOT NULL,
+        operation TEXT NOT NULL CHECK (operation IN ('index', 'update', 'delete')),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    
+    cursor.execute("CREATE INDEX IF NOT EXISTS index_outbox_ready_idx ON index_outbox(next_attempt_at, id)")
+    
+    # The keyset pagination indexes on ideas are built by scripts/setup_db.py,
+    # not here: a plain CREATE INDEX would lock writes on every startup
+    
+    # Running rating total so feedback writes update averages in O(1);
+    # backfilled from existing feedback the first time it is added
+    cursor.execute("""
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = 'ideas' AND column_name = 'rating_sum'
+    """)
+    if cursor.fetchone() is None:
+        cursor.execute("ALTER TABLE ideas ADD COLUMN IF NOT EXISTS rating_sum BIGINT NOT NULL DEFAULT 0")
+        repair_rating_aggregates(cursor)
+    
     conn.commit()
     cursor.close()
-    
-    print("Database initialized")
 
 def get_db():
-    db = DBSession()
+    """Check out a pooled connection for the duration of a request."""
+    pg_pool = DBSession().get_postgres_pool()
+    conn = pg_pool.checkout()
+    try:
+        yield DBConnection(conn)
+    finally:
+        pg_pool.release(conn)
+
+@asynccontextmanager
+async def db_connection() -> AsyncIterator[DBConnection]:
+    """Check out a pooled connection from async code for just one block.
+    
+    Routes that spend most of their time on inference use this instead of
+    ``get_db`` so they don't hold a connection while the model runs.
+    """
+    pg_pool = DBSession().get_postgres_pool()
+    conn = await run_in_threadpool(pg_pool.checkout)
     try:
-        yield db
+        yield DBConnection(conn)
     finally:
-        pass  # We're not closing the connection here to reuse it
\ No newline at end of file
+        await run_in_threadpool(pg_pool.release, conn)
\ No newline at end of file
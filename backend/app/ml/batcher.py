@@ -0,0 +1,149 @@
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.ml.embeddings import batch_generate_embeddings
+from app.ml.executor import get_inference_executor
+from app.utils.stats import latency_summary_ms
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into shared forward passes.
+
+    Callers await ``embed``; requests that arrive within ``window_ms`` of the
+    first queued one (or until ``max_batch_size`` is reached) are encoded
+    together on the embedding inference executor, and each caller's future
+    is resolved with its own vector.
+    """
+
+    def __init__(self, max_batch_size: Optional[int] = None, window_ms: Optional[float] = None):
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_BATCHER_MAX_SIZE
+        self.window = (window_ms if window_ms is not None else settings.EMBEDDING_BATCHER_WINDOW_MS) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # A queue.get() still waiting when the last window closed; reused so
+        # an item it dequeues is never lost to a timeout
+        self._getter: Optional[asyncio.Future] = None
+
+        # Stats
+        self._batch_sizes: Counter = Counter()
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._total_requests = 0
+        self._total_batches = 0
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._getter = None
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Queue a text for embedding and wait for its vector."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future, float]]:
+        """Wait for one request, then gather more until the window closes."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._next_item()]
+        deadline = loop.time() + self.window
+
+        while len(batch) < self.max_batch_size:
+            # Drain anything already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            item = await self._next_item(timeout)
+            if item is None:
+                break
+            batch.append(item)
+
+        return batch
+
+    async def _next_item(self, timeout: Optional[float] = None) -> Optional[Tuple[str, asyncio.Future, float]]:
+        """Next queued request, or None if ``timeout`` passes first.
+
+        Unlike ``wait_for``, a timeout leaves the pending get running for the
+        next call instead of cancelling it, so nothing it dequeues is dropped.
+        """
+        if self._getter is None:
+            self._getter = asyncio.ensure_future(self._queue.get())
+
+        done, _ = await asyncio.wait({self._getter}, timeout=timeout)
+        if not done:
+            return None
+
+        getter, self._getter = self._getter, None
+        return getter.result()
+
+    async def _run(self):
+        executor = get_inference_executor("embedding")
+
+        while True:
+            batch = await self._collect_batch()
+            batch = [item for item in batch if not item[1].cancelled()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self._wait_times.append(started - enqueued)
+            self._batch_sizes[len(batch)] += 1
+            self._total_batches += 1
+            self._total_requests += len(batch)
+
+            texts = [text for text, _, _ in batch]
+            try:
+                embeddings = await executor.run(batch_generate_embeddings, texts, use_cache=True)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
+    async def stop(self):
+        """Cancel the worker task."""
+        if self._getter is not None:
+            self._getter.cancel()
+            self._getter = None
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth, batch-size histogram and queue wait times."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window * 1000.0,
+            "total_requests": self._total_requests,
+            "total_batches": self._total_batches,
+            "avg_batch_size": self._total_requests / self._total_batches if self._total_batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "wait_ms": latency_summary_ms(self._wait_times)
+        }
+
+_batcher: Optional[EmbeddingBatcher] = None
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher()
+    return _batcher
\ No newline at end of file
@@ -0,0 +1,145 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.ml.embeddings import batch_generate_embeddings
+from app.ml.executor import get_inference_executor
+from app.rag.vector_store import get_vector_store
+
+def num_candidates_for(num_ideas: int) -> int:
+    """How many candidates to generate so dedup can still fill ``num_ideas``."""
+    if not settings.IDEA_DEDUP_ENABLED:
+        return num_ideas
+    return max(num_ideas, math.ceil(num_ideas * settings.IDEA_CANDIDATE_OVERSAMPLE))
+
+def embed_ideas(ideas: List[Dict[str, str]], query_text: str) -> np.ndarray:
+    """Unit-length embeddings of the ideas followed by ``query_text``, in one batch."""
+    texts = [f"{idea['title']} {idea['description']}" for idea in ideas]
+    return np.stack(batch_generate_embeddings(texts + [query_text], normalize=True))
+
+def indexed_similarity(
+    candidates: np.ndarray,
+    topic: str,
+    similarity_threshold: Optional[float] = None
+) -> np.ndarray:
+    """Each candidate's similarity to its closest indexed idea for ``topic``.
+
+    One top-1 store search per candidate with ``similarity_threshold``, so
+    only matches cross the network; candidates without one score 0. A failed
+    lookup scores everything 0, since dedup against the index is best effort.
+    """
+    similarity_threshold = similarity_threshold if similarity_threshold is not None else settings.IDEA_DEDUP_THRESHOLD
+    scores = np.zeros(len(candidates), dtype=np.float32)
+
+    try:
+        store = get_vector_store()
+        for i, candidate in enumerate(candidates):
+            matches = store.search(
+                candidate,
+                top_k=1,
+                similarity_threshold=similarity_threshold,
+                filters={"topic": topic}
+            )
+            if matches:
+                scores[i] = matches[0]["similarity_score"]
+    except Exception as e:
+        print(f"Error checking indexed ideas for dedup: {e}")
+        scores[:] = 0.0
+
+    return scores
+
+def select_diverse_ideas(
+    ideas: List[Dict[str, str]],
+    num_ideas: int,
+    candidates: np.ndarray,
+    query: np.ndarray,
+    indexed: Optional[np.ndarray] = None,
+    similarity_threshold: Optional[float] = None,
+    mmr_lambda: Optional[float] = None
+) -> List[Dict[str, str]]:
+    """Drop near-duplicate ideas and pick a diverse, relevant subset.
+
+    ``candidates`` are the ideas' unit-length embeddings, ``query`` the
+    request's and ``indexed`` each candidate's similarity to the closest
+    already indexed idea. A candidate is dropped when its similarity to an
+    indexed idea or to an already selected sibling exceeds
+    ``similarity_threshold``. The rest are picked greedily by maximal
+    marginal relevance: ``lambda * sim(query) - (1 - lambda) * max sim(selected)``.
+
+    If too many candidates were dropped, the result is topped up with the
+    most relevant of them that are below ``IDEA_DEDUP_EXACT_THRESHOLD``, so
+    only near-exact copies can leave it short of ``num_ideas``.
+    """
+    if not ideas:
+        return []
+
+    similarity_threshold = similarity_threshold if similarity_threshold is not None else settings.IDEA_DEDUP_THRESHOLD
+    mmr_lambda = mmr_lambda if mmr_lambda is not None else settings.IDEA_MMR_LAMBDA
+    if indexed is None:
+        indexed = np.zeros(len(ideas), dtype=np.float32)
+
+    eligible = indexed <= similarity_threshold
+
+    relevance = candidates @ query
+    pairwise = candidates @ candidates.T
+    max_sim_to_selected = np.full(len(ideas), -np.inf, dtype=np.float32)
+    selected: List[int] = []
+
+    while len(selected) < num_ideas:
+        # Siblings too close to something already chosen are dropped for good
+        eligible &= max_sim_to_selected <= similarity_threshold
+        if not eligible.any():
+            break
+
+        redundancy = np.where(np.isneginf(max_sim_to_selected), 0.0, max_sim_to_selected)
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        scores[~eligible] = -np.inf
+
+        best = int(np.argmax(scores))
+        selected.append(best)
+        eligible[best] = False
+        max_sim_to_selected = np.maximum(max_sim_to_selected, pairwise[best])
+
+    # Top up from the dropped candidates, most relevant first, skipping copies
+    for i in np.argsort(-relevance):
+        if len(selected) >= num_ideas:
+            break
+        i = int(i)
+        if i in selected or indexed[i] >= settings.IDEA_DEDUP_EXACT_THRESHOLD:
+            continue
+        if max_sim_to_selected[i] >= settings.IDEA_DEDUP_EXACT_THRESHOLD:
+            continue
+        selected.append(i)
+        max_sim_to_selected = np.maximum(max_sim_to_selected, pairwise[i])
+
+    return [ideas[i] for i in selected]
+
+async def filter_generated_ideas(
+    ideas: List[Dict[str, str]],
+    num_ideas: int,
+    topic: str,
+    keywords: List[str]
+) -> List[Dict[str, str]]:
+    """Dedup generated ideas against each other and the topic's indexed ideas.
+
+    Only the encode runs on the embedding executor; the vector store
+    lookups run on the thread pool so they don't hold up search embeddings.
+    If the encode fails or the executor is saturated, the ideas are kept as
+    generated rather than failing a request whose generation already ran.
+    """
+    if not settings.IDEA_DEDUP_ENABLED or not ideas:
+        return ideas[:num_ideas]
+
+    query_text = " ".join([topic] + list(keywords))
+    try:
+        embeddings = await get_inference_executor("embedding").run(embed_ideas, ideas, query_text)
+    except Exception as e:
+        print(f"Error embedding ideas for dedup, keeping them as generated: {e}")
+        return ideas[:num_ideas]
+    candidates, query = embeddings[:-1], embeddings[-1]
+
+    indexed = await run_in_threadpool(indexed_similarity, candidates, topic)
+    return select_diverse_ideas(ideas, num_ideas, candidates, query, indexed=indexed)
\ No newline at end of file
@@ -1,53 +1,248 @@
+import hashlib
+import re
+import unicodedata
 import torch
 import numpy as np
-from typing import Union, List
+from typing import Union, List, Dict, Optional, Tuple
 
+from app.core.config import settings
+from app.core.metrics import time_stage
 from app.ml.model import get_model_manager
+from app.utils.cache import LRUTTLCache, SQLiteCacheBackend
 
-def generate_embedding(text: str) -> np.ndarray:
+_embedding_cache: Optional[LRUTTLCache] = None
+
+def get_embedding_cache() -> LRUTTLCache:
+    """Get the process-wide query embedding cache."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        shared_backend = None
+        if settings.EMBEDDING_CACHE_SHARED_PATH:
+            shared_backend = SQLiteCacheBackend(
+                settings.EMBEDDING_CACHE_SHARED_PATH,
+                max_rows=settings.EMBEDDING_CACHE_SHARED_MAX_ROWS
+            )
+
+        _embedding_cache = LRUTTLCache(
+            max_entries=settings.EMBEDDING_CACHE_SIZE,
+            ttl_seconds=settings.EMBEDDING_CACHE_TTL,
+            max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+            sizeof=lambda embedding: embedding.nbytes,
+            shared_backend=shared_backend,
+            serialize=lambda embedding: embedding.astype(np.float32).tobytes(),
+            deserialize=lambda payload: np.frombuffer(payload, dtype=np.float32).copy(),
+            name="embedding"
+        )
+    return _embedding_cache
+
+def normalize_text(text: str) -> str:
+    """Canonicalise text so trivially different queries share a cache entry."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return re.sub(r"\s+", " ", text).strip()
+
+def embedding_cache_key(text: str, normalize: bool) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{settings.EMBEDDING_MODEL}:{int(normalize)}:{digest}"
+
+def generate_embedding(text: str, normalize: Optional[bool] = None, use_cache: bool = True) -> np.ndarray:
     """Generate an embedding vector for the given text."""
+    return batch_generate_embeddings([text], normalize=normalize, use_cache=use_cache)[0]
+
+def mean_pool(last_hidden_state: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+    """Average token vectors over real tokens only, ignoring padding."""
+    mask = attention_mask.unsqueeze(-1).to(last_hidden_state.dtype)
+    summed = (last_hidden_state * mask).sum(dim=1)
+    counts = mask.sum(dim=1).clamp(min=1e-9)
+    return summed / counts
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """Scale vectors (a single vector or one per row) to unit L2 norm."""
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+def _encode_batch(features: List[Dict[str, List[int]]], tokenizer, model, normalize: bool) -> np.ndarray:
+    """Run one padded forward pass over pre-tokenized inputs."""
+    inputs = tokenizer.pad(features, padding=True, return_tensors="pt").to(model.device)
+
+    # Generate embeddings
+    with time_stage("encode"), torch.no_grad():
+        outputs = model(**inputs)
+        pooled = mean_pool(outputs.last_hidden_state, inputs["attention_mask"])
+
+        if normalize:
+            pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+
+    return pooled.float().cpu().numpy()
+
+def batch_generate_embeddings(
+    texts: List[str],
+    batch_size: Optional[int] = None,
+    normalize: Optional[bool] = None,
+    use_cache: bool = False
+) -> List[np.ndarray]:
+    """Generate embeddings for multiple texts.
+
+    Texts are tokenized in a single call, sorted by token length so that each
+    padded micro-batch wastes as little compute as possible, and encoded with
+    one forward pass per batch. Pooling respects the attention mask, so a text
+    gets the same vector whatever batch it lands in. Vectors are float32 and,
+    unless ``normalize`` is False, unit length. Results are returned in input
+    order.
+
+    With ``use_cache`` set, texts already in the embedding cache are served
+    from it and only the misses are encoded. Bulk indexing leaves it off so
+    one-off documents don't evict hot queries.
+    """
+    if not texts:
+        return []
+
+    if normalize is None:
+        normalize = settings.EMBEDDING_NORMALIZE
+
+    if use_cache:
+        cache = get_embedding_cache()
+        keys = [embedding_cache_key(text, normalize) for text in texts]
+        embeddings = [cache.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        if missing:
+            computed = _encode_texts([texts[i] for i in missing], batch_size, normalize)
+            for i, embedding in zip(missing, computed):
+                cache.set(keys[i], embedding)
+                embeddings[i] = embedding
+
+        return embeddings
+
+    return _encode_texts(texts, batch_size, normalize)
+
+def _encode_texts(texts: List[str], batch_size: Optional[int], normalize: bool) -> List[np.ndarray]:
+    """Encode texts with the embedding model, bypassing the cache."""
+    batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
     model_manager = get_model_manager()
-    
+
     # Get models
     tokenizer = model_manager.get_embedding_tokenizer()
     model = model_manager.get_embedding_model()
-    
-    # Tokenize input
-    inputs = tokenizer(
-        text, 
-        return_tensors="pt", 
-        truncation=True, 
-        padding=True, 
-        max_length=512
-    ).to(model.device)
-    
-    # Generate embeddings
-    with torch.no_grad():
-        outputs = model(**inputs)
-    
-    # Use mean pooling to get a single vector
-    embeddings = outputs.last_hidden_state.mean(dim=1).squeeze().cpu().numpy()
-    
+
+    # Tokenize all inputs once, without padding
+    with time_stage("tokenize"):
+        encoded = tokenizer(
+            texts,
+            truncation=True,
+            padding=False,
+            max_length=settings.EMBEDDING_MAX_LENGTH
+        )
+
+    # Sort by token length to minimise padding inside each batch
+    order = sorted(range(len(texts)), key=lambda i: len(encoded["input_ids"][i]))
+
+    embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        batch_indices = order[start:start + batch_size]
+        features = [
+            {key: encoded[key][i] for key in encoded.keys()}
+            for i in batch_indices
+        ]
+        batch_embeddings = _encode_batch(features, tokenizer, model, normalize)
+
+        for row, index in enumerate(batch_indices):
+            embeddings[index] = batch_embeddings[row]
+
     return embeddings
 
-def batch_generate_embeddings(texts: List[str]) -> List[np.ndarray]:
-    """Generate embeddings for multiple texts."""
-    return [generate_embedding(text) for text in texts]
-
-def compute_similarity(embedding1: np.ndarray, embedding2: np.ndarray) -> float:
-    """Compute cosine similarity between two embeddings."""
-    # Normalize vectors
-    embedding1_norm = embedding1 / np.linalg.norm(embedding1)
-    embedding2_norm = embedding2 / np.linalg.norm(embedding2)
-    
-    # Compute cosine similarity
-    similarity = np.dot(embedding1_norm, embedding2_norm)
-    
-    return float(similarity)
+def compute_similarity(
+    embedding1: np.ndarray,
+    embedding2: np.ndarray,
+    normalized: bool = False
+) -> float:
+    """Compute cosine similarity between two embeddings.
+
+    Pass ``normalized=True`` when both vectors are known to be unit length
+    to skip normalisation; their cosine similarity is then a plain dot
+    product.
+    """
+    if not normalized:
+        embedding1 = normalize_embeddings(embedding1)
+        embedding2 = normalize_embeddings(embedding2)
+
+    return float(np.dot(embedding1, embedding2))
 
 def compute_text_similarity(text1: str, text2: str) -> float:
     """Compute semantic similarity between two texts."""
-    embedding1 = generate_embedding(text1)
-    embedding2 = generate_embedding(text2)
-    
-    return compute_similarity(embedding1, embedding2)
\ No newline at end of file
+    embedding1, embedding2 = batch_generate_embeddings([text1, text2], normalize=True)
+
+    return compute_similarity(embedding1, embedding2, normalized=True)
+
+def top_k_similarity(
+    queries: np.ndarray,
+    candidates: np.ndarray,
+    k: int,
+    threshold: Optional[float] = None,
+    candidate_mask: Optional[np.ndarray] = None,
+    normalized: bool = False,
+    max_bytes: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the ``k`` most similar candidates for each query vector.
+
+    ``queries`` is one vector or a ``(q, d)`` matrix and ``candidates`` an
+    ``(n, d)`` matrix. Scores are computed with one matrix product per chunk
+    of candidates, where chunks are sized so the score block stays within
+    ``max_bytes`` (``SIMILARITY_MAX_BYTES`` by default), and the best ``k``
+    per query are picked with ``argpartition``. Rows where
+    ``candidate_mask`` is False are never returned. Both inputs are
+    normalised unless ``normalized=True`` says they are already unit length.
+
+    Returns ``(indices, scores)`` sorted by descending score. For a matrix of
+    queries both are ``(q, k)`` arrays padded with index -1 and score -inf
+    where fewer than ``k`` candidates qualify (because of ``threshold``, the
+    mask or a small matrix). For a single query vector the padding is
+    dropped and both arrays are 1-D.
+    """
+    max_bytes = max_bytes or settings.SIMILARITY_MAX_BYTES
+
+    single = queries.ndim == 1
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    if not normalized:
+        queries = normalize_embeddings(queries)
+
+    num_queries, num_candidates = queries.shape[0], candidates.shape[0]
+    k = max(0, min(k, num_candidates))
+    best_indices = np.full((num_queries, k), -1, dtype=np.int64)
+    best_scores = np.full((num_queries, k), -np.inf, dtype=np.float32)
+
+    if k:
+        chunk_rows = max(k, max_bytes // (4 * max(num_queries, 1)))
+
+        for start in range(0, num_candidates, chunk_rows):
+            chunk = np.asarray(candidates[start:start + chunk_rows], dtype=np.float32)
+            if not normalized:
+                chunk = normalize_embeddings(chunk)
+
+            scores = queries @ chunk.T
+            if candidate_mask is not None:
+                scores[:, ~candidate_mask[start:start + chunk_rows]] = -np.inf
+
+            # Keep the best k of (previous best + this chunk)
+            merged_scores = np.concatenate([best_scores, scores], axis=1)
+            merged_indices = np.concatenate(
+                [best_indices, np.broadcast_to(np.arange(start, start + chunk.shape[0]), scores.shape)],
+                axis=1
+            )
+            top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(merged_scores, top, axis=1)
+            best_indices = np.take_along_axis(merged_indices, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_indices = np.take_along_axis(best_indices, order, axis=1)
+
+        invalid = np.isneginf(best_scores)
+        if threshold is not None:
+            invalid |= best_scores < threshold
+        best_indices[invalid] = -1
+        best_scores[invalid] = -np.inf
+
+    if single:
+        keep = best_indices[0] >= 0
+        return best_indices[0][keep], best_scores[0][keep]
+    return best_indices, best_scores
\ No newline at end of file
@@ -0,0 +1,91 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.core.config import settings
+
+class ExecutorSaturatedError(Exception):
+    """Raised when an inference executor has no room for another job."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"The {name} executor is at capacity")
+        self.name = name
+        self.retry_after = retry_after
+
+class InferenceExecutor:
+    """Bounded worker pool that runs blocking model calls off the event loop.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue_size``
+    more may wait; anything beyond that is rejected immediately with
+    ``ExecutorSaturatedError`` instead of piling up behind slow inference.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue_size: int, retry_after: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-inference")
+        self._pending = 0
+        self._rejected = 0
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> asyncio.Future:
+        """Admit ``fn`` and schedule it on a worker thread.
+
+        Admission happens synchronously, so callers that start work in the
+        background (e.g. streaming responses) are rejected before they reply.
+        """
+        # Only touched from the event loop thread, so no lock is needed
+        if self._pending >= self.max_workers + self.max_queue_size:
+            self._rejected += 1
+            raise ExecutorSaturatedError(self.name, self.retry_after)
+
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+
+        def job():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                # Release the slot when the thread finishes, even if the caller gave up
+                loop.call_soon_threadsafe(self._release)
+
+        return loop.run_in_executor(self._executor, job)
+
+    def _release(self):
+        self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn`` on a worker thread and await its result."""
+        return await self.submit(fn, *args, **kwargs)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "in_flight": min(self._pending, self.max_workers),
+            "queued": max(self._pending - self.max_workers, 0),
+            "rejected": self._rejected
+        }
+
+_executors: Dict[str, InferenceExecutor] = {}
+
+def get_inference_executor(name: str) -> InferenceExecutor:
+    """Get the shared executor for a workload ("embedding" or "generation")."""
+    if name not in _executors:
+        if name == "embedding":
+            workers, queue_size = settings.EMBEDDING_EXECUTOR_WORKERS, settings.EMBEDDING_EXECUTOR_QUEUE_SIZE
+        elif name == "generation":
+            workers, queue_size = settings.GENERATION_EXECUTOR_WORKERS, settings.GENERATION_EXECUTOR_QUEUE_SIZE
+        else:
+            raise ValueError(f"Unknown inference executor: {name}")
+        _executors[name] = InferenceExecutor(name, workers, queue_size, settings.INFERENCE_RETRY_AFTER)
+    return _executors[name]
+
+def shutdown_executors():
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
\ No newline at end of file
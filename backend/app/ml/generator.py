@@ -1,6 +1,112 @@
-from typing import Dict, Any, List, Optional
+import hashlib
+import json
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer, set_seed
+from app.core.config import settings
+from app.core.metrics import time_stage
 from app.ml.model import get_model_manager
 from app.ml.prompt import create_prompt
+from app.utils.cache import LRUTTLCache, SQLiteCacheBackend
+
+# Ideas are separated by a blank line in generated text
+IDEA_SEPARATOR = "\n\n"
+
+_generation_cache: Optional[LRUTTLCache] = None
+
+def get_generation_cache() -> LRUTTLCache:
+    """Get the process-wide cache of stored ideas for deterministic requests."""
+    global _generation_cache
+    if _generation_cache is None:
+        shared_backend = None
+        if settings.GENERATION_CACHE_SHARED_PATH:
+            shared_backend = SQLiteCacheBackend(
+                settings.GENERATION_CACHE_SHARED_PATH,
+                max_rows=settings.GENERATION_CACHE_SHARED_MAX_ROWS
+            )
+
+        _generation_cache = LRUTTLCache(
+            max_entries=settings.GENERATION_CACHE_SIZE,
+            ttl_seconds=settings.GENERATION_CACHE_TTL,
+            shared_backend=shared_backend,
+            serialize=lambda ideas: json.dumps(ideas).encode("utf-8"),
+            deserialize=lambda payload: json.loads(payload.decode("utf-8")),
+            name="generation"
+        )
+    return _generation_cache
+
+def build_generation_params(
+    creativity: float,
+    max_length: int,
+    customization: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], Optional[int]]:
+    """Effective ``generate`` kwargs plus the optional ``seed`` model param."""
+    # Configure generation parameters
+    gen_params = {
+        "max_length": max_length,
+        "temperature": creativity,
+        "do_sample": True
+    }
+
+    # Apply custom model parameters if provided
+    if customization and "model_params" in customization:
+        gen_params.update(customization["model_params"])
+
+    # The seed is not a generate kwarg; it seeds the RNGs before generating
+    seed = gen_params.pop("seed", None)
+    return gen_params, seed
+
+def is_deterministic_request(creativity: float, customization: Optional[Dict[str, Any]] = None) -> bool:
+    """Whether identical requests should produce reusable output."""
+    model_params = (customization or {}).get("model_params") or {}
+    return creativity <= settings.GENERATION_CACHE_MAX_CREATIVITY or model_params.get("seed") is not None
+
+def generation_cache_key(prompt: str, gen_params: Dict[str, Any], seed: Optional[int], num_ideas: int) -> str:
+    """Canonical hash of everything that determines the generated ideas."""
+    canonical = json.dumps({
+        "model": settings.GENERATION_MODEL,
+        "mode": settings.GENERATION_MODE,
+        "prompt": prompt,
+        "params": gen_params,
+        "seed": seed,
+        "num_ideas": num_ideas
+    }, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _prepare_generation(
+    topic: str,
+    keywords: List[str],
+    contexts: List[str],
+    creativity: float,
+    max_length: int,
+    customization: Optional[Dict[str, Any]]
+) -> Tuple[str, Dict[str, Any], Optional[int], bool]:
+    """Prompt, ``generate`` kwargs, seed and whether to use multi-sequence mode."""
+    gen_params, seed = build_generation_params(creativity, max_length, customization)
+
+    # Greedy and beam search can't return several distinct sequences, so
+    # non-sampling requests keep the single-text mode
+    multi_sequence = settings.GENERATION_MODE == "multi_sequence" and bool(gen_params.get("do_sample"))
+
+    # Create prompt
+    with time_stage("prompt_build"):
+        prompt = create_prompt(topic, keywords, contexts, customization, single_idea=multi_sequence)
+    return prompt, gen_params, seed, multi_sequence
+
+def generation_request_key(
+    topic: str,
+    keywords: List[str],
+    contexts: List[str],
+    num_ideas: int,
+    creativity: float,
+    max_length: int,
+    customization: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """Generation cache key for a deterministic request, or None if its output isn't reusable."""
+    if not is_deterministic_request(creativity, customization):
+        return None
+    prompt, gen_params, seed, _ = _prepare_generation(topic, keywords, contexts, creativity, max_length, customization)
+    return generation_cache_key(prompt, gen_params, seed, num_ideas)
 
 def generate_ideas(
     topic: str,
@@ -12,56 +118,201 @@ def generate_ideas(
     customization: Optional[Dict[str, Any]] = None
 ) -> List[Dict[str, str]]:
     """Generate creative ideas based on input parameters."""
+    prompt, gen_params, seed, multi_sequence = _prepare_generation(
+        topic, keywords, contexts, creativity, max_length, customization
+    )
+
+    if seed is not None:
+        set_seed(int(seed))
+
+    if multi_sequence:
+        return generate_ideas_multi_sequence(prompt, gen_params, num_ideas)
+    return generate_ideas_single_text(prompt, gen_params, num_ideas)
+
+def generate_ideas_single_text(prompt: str, gen_params: Dict[str, Any], num_ideas: int = 5) -> List[Dict[str, str]]:
+    """Generate one text and split it into ideas on blank lines."""
     model_manager = get_model_manager()
     generator = model_manager.get_generator()
-    
-    # Create prompt
-    prompt = create_prompt(topic, keywords, contexts, customization)
-    
-    # Configure generation parameters
-    gen_params = {
-        "max_length": max_length,
-        "temperature": creativity,
-        "num_return_sequences": 1,
-        "do_sample": True
-    }
-    
-    # Apply custom model parameters if provided
-    if customization and "model_params" in customization:
-        gen_params.update(customization["model_params"])
-    
+
     # Generate ideas
-    results = generator(prompt, **gen_params)
-    
+    with time_stage("generate"):
+        results = generator(prompt, **{**gen_params, "num_return_sequences": 1})
+
     # Process results
     ideas = process_generation_result(results, num_ideas)
-    
+
     return ideas
 
+def generate_ideas_multi_sequence(prompt: str, gen_params: Dict[str, Any], num_ideas: int = 5) -> List[Dict[str, str]]:
+    """Generate ideas with one sampled sequence per idea.
+
+    A single ``generate`` call returns ``num_ideas`` sequences, each parsed
+    as one idea. Empty or duplicate sequences are topped up with a further
+    batched call for just the shortfall, up to ``GENERATION_MAX_ATTEMPTS``
+    calls in total; any remaining gap is filled with the duplicates, so the
+    result has ``num_ideas`` entries whenever the model produces any text.
+    """
+    model_manager = get_model_manager()
+    generator = model_manager.get_generator()
+
+    ideas: List[Dict[str, str]] = []
+    duplicates: List[Dict[str, str]] = []
+    seen = set()
+
+    for _ in range(max(1, settings.GENERATION_MAX_ATTEMPTS)):
+        missing = num_ideas - len(ideas)
+        if missing <= 0:
+            break
+
+        with time_stage("generate"):
+            results = generator(prompt, **{**gen_params, "num_return_sequences": missing})
+
+        for result in results:
+            idea = parse_idea(result["generated_text"], len(ideas))
+            if idea is None:
+                continue
+
+            key = (idea["title"].lower(), idea["description"].lower())
+            if key in seen:
+                duplicates.append(idea)
+                continue
+
+            seen.add(key)
+            ideas.append(idea)
+
+    # Fill any remaining gap rather than returning fewer ideas than asked for
+    while len(ideas) < num_ideas and duplicates:
+        ideas.append(duplicates.pop(0))
+
+    return ideas[:num_ideas]
+
+class IdeaStream:
+    """Token-by-token idea generation that yields each idea as soon as its
+    separator has been produced.
+
+    ``generate`` blocks and must run on a worker thread while the stream is
+    iterated elsewhere. Generation stops early once ``num_ideas`` ideas have
+    been emitted.
+    """
+
+    def __init__(self, model, tokenizer, inputs, gen_params: Dict[str, Any], num_ideas: int,
+                 seed: Optional[int] = None):
+        self.model = model
+        self.inputs = inputs
+        self.gen_params = gen_params
+        self.num_ideas = num_ideas
+        self.seed = seed
+        self.streamer = TextIteratorStreamer(
+            tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True,
+            timeout=settings.GENERATION_STREAM_TIMEOUT
+        )
+        self._done = threading.Event()
+
+    def generate(self):
+        stopping_criteria = StoppingCriteriaList([_EventStoppingCriteria(self._done)])
+        try:
+            # Seed on the thread that samples, right before sampling, so no
+            # other request can consume the seeded RNG state in between
+            if self.seed is not None:
+                set_seed(int(self.seed))
+            with time_stage("generate"):
+                return self.model.generate(
+                    **self.inputs,
+                    **self.gen_params,
+                    streamer=self.streamer,
+                    stopping_criteria=stopping_criteria
+                )
+        except Exception:
+            # Unblock the consumer instead of leaving it waiting for tokens
+            self.streamer.end()
+            raise
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        buffer = ""
+        count = 0
+
+        try:
+            for chunk in self.streamer:
+                buffer += chunk
+                while IDEA_SEPARATOR in buffer and count < self.num_ideas:
+                    idea_text, buffer = buffer.split(IDEA_SEPARATOR, 1)
+                    idea = parse_idea(idea_text, count)
+                    if idea is not None:
+                        count += 1
+                        yield idea
+
+                if count >= self.num_ideas:
+                    return
+
+            # The last idea has no trailing separator
+            idea = parse_idea(buffer, count)
+            if idea is not None:
+                yield idea
+        finally:
+            self._done.set()
+
+class _EventStoppingCriteria(StoppingCriteria):
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.event.is_set()
+
+def prepare_idea_stream(
+    topic: str,
+    keywords: List[str],
+    contexts: List[str],
+    num_ideas: int = 5,
+    creativity: float = 0.7,
+    max_length: int = 200,
+    customization: Optional[Dict[str, Any]] = None
+) -> IdeaStream:
+    """Set up streaming generation around the generator pipeline's model."""
+    model_manager = get_model_manager()
+    generator = model_manager.get_generator()
+
+    # Create prompt
+    with time_stage("prompt_build"):
+        prompt = create_prompt(topic, keywords, contexts, customization)
+    with time_stage("tokenize"):
+        inputs = generator.tokenizer(prompt, return_tensors="pt").to(generator.model.device)
+
+    gen_params, seed = build_generation_params(creativity, max_length, customization)
+
+    return IdeaStream(generator.model, generator.tokenizer, inputs, gen_params, num_ideas, seed=seed)
+
+def parse_idea(idea_text: str, index: int = 0) -> Optional[Dict[str, str]]:
+    """Parse one 'Title: Description' block into an idea."""
+    if not idea_text.strip():
+        return None
+
+    parts = idea_text.split(":", 1)
+    if len(parts) == 2:
+        title, description = parts
+    else:
+        title = f"Idea {index+1}"
+        description = idea_text
+
+    return {
+        "title": title.strip(),
+        "description": description.strip()
+    }
+
 def process_generation_result(results, num_ideas=5) -> List[Dict[str, str]]:
     """Process raw generation results into structured ideas."""
     try:
         # Extract generated text
         text = results[0]['generated_text']
-        
+
         # Split into ideas
         ideas = []
-        for i, idea_text in enumerate(text.split("\n\n")[:num_ideas]):
-            if not idea_text.strip():
-                continue
-                
-            parts = idea_text.split(":", 1)
-            if len(parts) == 2:
-                title, description = parts
-            else:
-                title = f"Idea {i+1}"
-                description = idea_text
-                
-            ideas.append({
-                "title": title.strip(),
-                "description": description.strip()
-            })
-        
+        for i, idea_text in enumerate(text.split(IDEA_SEPARATOR)[:num_ideas]):
+            idea = parse_idea(idea_text, i)
+            if idea is not None:
+                ideas.append(idea)
+
         return ideas
     except Exception as e:
         print(f"Error processing generation result: {e}")
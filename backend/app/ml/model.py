@@ -1,42 +1,218 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
 import torch
-from functools import lru_cache
-from transformers import pipeline, AutoTokenizer, AutoModel
+from transformers import pipeline, AutoTokenizer, AutoModel, AutoModelForSeq2SeqLM
 
 from app.core.config import settings
+from app.core.metrics import MODEL_EVICTIONS, MODEL_LOADS, MODEL_MEMORY_BYTES, time_stage
+
+GENERATION_TASK = "text2text-generation"
+
+INFERENCE_BACKENDS = ("pytorch", "int8", "onnx")
+
+# Sentences embedded by both the fp32 and the optimised encoder in the parity check
+PARITY_TEXTS = [
+    "A mobile app that helps neighbours share tools and equipment.",
+    "Machine learning for early detection of crop diseases",
+    "Subscription service for refurbished office furniture",
+    "renewable energy, community, micro-grids",
+    "How can small cafés reduce food waste at the end of the day?"
+]
 
 class ModelManager:
+    """Registry of loaded models with LRU eviction.
+    
+    At most ``MODEL_CACHE_SIZE`` models stay resident, and their combined
+    parameter memory stays under ``MODEL_MEMORY_BUDGET_MB`` when set. The
+    least recently used model is dropped (with its tokenizer) and the
+    allocator caches are released when either limit is exceeded. Callers
+    that still hold an evicted model keep it alive until they finish.
+    """
     _instance = None
+    _instance_lock = threading.Lock()
     
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(ModelManager, cls).__new__(cls)
-            cls._instance._initialize()
+        with cls._instance_lock:
+            if cls._instance is None:
+                instance = super(ModelManager, cls).__new__(cls)
+                instance._initialize()
+                cls._instance = instance
         return cls._instance
     
     def _initialize(self):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"Using device: {self.device}")
-        self._models = {}
+        _configure_torch_threads()
+        self.backend = settings.INFERENCE_BACKEND
+        if self.backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"Unknown inference backend: {self.backend}")
+        if self.backend != "pytorch" and self.device != "cpu":
+            # Dynamic int8 and the ONNX export are CPU optimisations
+            print(f"Inference backend {self.backend} is CPU-only, using pytorch on {self.device}")
+            self.backend = "pytorch"
+        print(f"Inference backend: {self.backend}")
+        self._parity: Optional[Dict[str, Any]] = None
+        self._models: "OrderedDict[Tuple[str, Optional[str]], Tuple[Any, int]]" = OrderedDict()
+        self._tokenizers: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._load_locks: Dict[Any, threading.Lock] = {}
+        self._evictions = 0
+        self._ready = False
+        self._preload_error: Optional[str] = None
+    
+    def _load_lock(self, key) -> threading.Lock:
+        """Per-model lock so concurrent callers share one in-flight load."""
+        with self._lock:
+            if key not in self._load_locks:
+                self._load_locks[key] = threading.Lock()
+            return self._load_locks[key]
     
-    @lru_cache(maxsize=settings.MODEL_CACHE_SIZE)
     def get_tokenizer(self, model_name):
         """Get or load a tokenizer."""
-        if f"{model_name}_tokenizer" not in self._models:
-            self._models[f"{model_name}_tokenizer"] = AutoTokenizer.from_pretrained(model_name)
-        return self._models[f"{model_name}_tokenizer"]
+        with self._lock:
+            if model_name in self._tokenizers:
+                return self._tokenizers[model_name]
+        
+        with self._load_lock(("tokenizer", model_name)):
+            with self._lock:
+                if model_name in self._tokenizers:
+                    return self._tokenizers[model_name]
+            
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            
+            with self._lock:
+                self._tokenizers[model_name] = tokenizer
+            return tokenizer
     
-    @lru_cache(maxsize=settings.MODEL_CACHE_SIZE)
     def get_model(self, model_name, task=None):
-        """Get or load a model."""
-        key = f"{model_name}_{task}" if task else model_name
+        """Get or load a model.
+        
+        Loads are single-flight per model: callers racing on a cold model
+        wait for the first one's load instead of loading their own copy.
+        Other models stay available while one is loading.
+        """
+        key = (model_name, task)
+        
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+        
+        with self._load_lock(key):
+            # Another caller may have finished loading while we waited
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+            
+            start = time.perf_counter()
+            with time_stage("model_load"):
+                model = self._load(model_name, task)
+            MODEL_LOADS.inc(model=model_name)
+            
+            size = _model_bytes(model)
+            print(f"Loaded model {model_name} ({size / 1024 / 1024:.0f} MB) in {time.perf_counter() - start:.1f}s")
+            
+            with self._lock:
+                self._models[key] = (model, size)
+                self._evict(keep=key)
+                MODEL_MEMORY_BYTES.set(self.memory_bytes())
+            return model
+    
+    def _load(self, model_name, task=None):
+        """Load a model or pipeline with the configured inference backend."""
+        if task and (self.backend == "pytorch" or task != GENERATION_TASK):
+            return pipeline(task, model=model_name, device=self.device)
+        
+        if self.backend == "pytorch":
+            model = AutoModel.from_pretrained(model_name).to(self.device)
+            model.eval()
+            return model
+        
+        if self.backend == "int8":
+            model_class = AutoModelForSeq2SeqLM if task else AutoModel
+            model = _quantize_int8(model_class.from_pretrained(model_name).eval())
+        else:
+            model = _load_onnx(model_name, seq2seq=bool(task))
+        
+        if task:
+            return pipeline(task, model=model, tokenizer=self.get_tokenizer(model_name))
+        return model
+    
+    def check_embedding_parity(self, fallback: bool = True) -> Dict[str, Any]:
+        """Compare the optimised embedding encoder against fp32 PyTorch.
+        
+        Embeds ``PARITY_TEXTS`` with both and checks every pair's cosine
+        similarity is at least ``INFERENCE_PARITY_MIN_COSINE``. With
+        ``fallback`` set, a failing encoder is replaced by the fp32 one so
+        new vectors stay comparable with the ones already indexed.
+        """
+        from app.ml.embeddings import mean_pool  # embeddings imports this module
+        
+        tokenizer = self.get_embedding_tokenizer()
+        model = self.get_embedding_model()
+        reference = AutoModel.from_pretrained(settings.EMBEDDING_MODEL).eval()
+        
+        inputs = tokenizer(PARITY_TEXTS, padding=True, truncation=True, return_tensors="pt")
+        with torch.no_grad():
+            expected = mean_pool(reference(**inputs).last_hidden_state, inputs["attention_mask"])
+            actual = mean_pool(model(**inputs).last_hidden_state, inputs["attention_mask"])
+        cosine = torch.nn.functional.cosine_similarity(expected.float(), actual.float(), dim=1)
+        
+        result = {
+            "backend": self.backend,
+            "min_cosine": round(float(cosine.min()), 6),
+            "mean_cosine": round(float(cosine.mean()), 6),
+            "tolerance": settings.INFERENCE_PARITY_MIN_COSINE,
+            "passed": float(cosine.min()) >= settings.INFERENCE_PARITY_MIN_COSINE,
+            "fallback": False
+        }
+        
+        if not result["passed"]:
+            print(f"Embedding parity check failed for {self.backend}: min cosine {result['min_cosine']}")
+            if fallback:
+                with self._lock:
+                    self._models[(settings.EMBEDDING_MODEL, None)] = (reference, _model_bytes(reference))
+                    self._evict(keep=(settings.EMBEDDING_MODEL, None))
+                result["fallback"] = True
         
-        if key not in self._models:
-            if task:
-                self._models[key] = pipeline(task, model=model_name, device=self.device)
-            else:
-                self._models[key] = AutoModel.from_pretrained(model_name).to(self.device)
+        self._parity = result
+        return result
+    
+    def _evict(self, keep: Tuple[str, Optional[str]]):
+        """Drop least recently used models until both limits hold."""
+        budget = settings.MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+        evicted = False
+        
+        while len(self._models) > 1:
+            over_count = len(self._models) > settings.MODEL_CACHE_SIZE
+            over_budget = budget > 0 and self.memory_bytes() > budget
+            if not (over_count or over_budget):
+                break
+            
+            key = next(k for k in self._models if k != keep)
+            self._models.pop(key)
+            # Keep the tokenizer while another entry still uses the same model name
+            if not any(name == key[0] for name, _ in self._models):
+                self._tokenizers.pop(key[0], None)
+            self._evictions += 1
+            MODEL_EVICTIONS.inc(model=key[0])
+            evicted = True
+            print(f"Evicted model {key[0]}" + (f" ({key[1]})" if key[1] else ""))
         
-        return self._models[key]
+        if evicted:
+            gc.collect()
+            if self.device == "cuda":
+                torch.cuda.empty_cache()
+    
+    def memory_bytes(self) -> int:
+        """Parameter and buffer memory of resident models."""
+        return sum(size for _, size in self._models.values())
     
     def get_embedding_model(self):
         """Get the embedding model."""
@@ -48,11 +224,132 @@ class ModelManager:
     
     def get_generator(self):
         """Get the text generation pipeline."""
-        return self.get_model(settings.GENERATION_MODEL, task="text2text-generation")
+        return self.get_model(settings.GENERATION_MODEL, task=GENERATION_TASK)
     
     def get_generator_tokenizer(self):
         """Get the generator tokenizer."""
         return self.get_tokenizer(settings.GENERATION_MODEL)
+    
+    def preload(self, warmup: bool = True):
+        """Load the configured models and run a warmup pass through each.
+        
+        Sets the readiness flag once everything is loaded, so the first
+        user request doesn't pay for loading or the first-call overheads.
+        """
+        try:
+            start = time.perf_counter()
+            for kind in [m.strip() for m in settings.MODEL_PRELOAD.split(",") if m.strip()]:
+                if kind == "embedding":
+                    self.get_embedding_tokenizer()
+                    self.get_embedding_model()
+                    if self.backend != "pytorch" and settings.INFERENCE_PARITY_CHECK:
+                        self.check_embedding_parity()
+                    if warmup:
+                        self._warmup_embedding()
+                elif kind == "generation":
+                    self.get_generator()
+                    if warmup:
+                        self._warmup_generator()
+                else:
+                    print(f"Unknown model in MODEL_PRELOAD: {kind}")
+            
+            self._ready = True
+            print(f"Models ready in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            self._preload_error = str(e)
+            print(f"Error preloading models: {e}")
+    
+    def _warmup_embedding(self):
+        tokenizer = self.get_embedding_tokenizer()
+        model = self.get_embedding_model()
+        inputs = tokenizer(["warmup"], padding=True, truncation=True, return_tensors="pt").to(self.device)
+        with torch.no_grad():
+            model(**inputs)
+    
+    def _warmup_generator(self):
+        self.get_generator()("warmup", max_length=8, num_return_sequences=1)
+    
+    def is_ready(self) -> bool:
+        """Whether startup preloading has finished."""
+        return self._ready
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models: List[Dict[str, Any]] = [
+                {"model": name, "task": task, "memory_mb": round(size / 1024 / 1024, 1)}
+                for (name, task), (_, size) in self._models.items()
+            ]
+            return {
+                "ready": self._ready,
+                "preload_error": self._preload_error,
+                "device": self.device,
+                "inference_backend": self.backend,
+                "embedding_parity": self._parity,
+                "torch_threads": torch.get_num_threads(),
+                "torch_interop_threads": torch.get_num_interop_threads(),
+                "models": models,
+                "memory_mb": round(self.memory_bytes() / 1024 / 1024, 1),
+                "memory_budget_mb": settings.MODEL_MEMORY_BUDGET_MB,
+                "max_models": settings.MODEL_CACHE_SIZE,
+                "evictions": self._evictions
+            }
+
+def _configure_torch_threads():
+    """Apply ``TORCH_NUM_THREADS``/``TORCH_NUM_INTEROP_THREADS`` (0 keeps torch's default).
+    
+    Torch sizes its pools to every core by default; with several workers on
+    one host, cap these to roughly cores per worker.
+    """
+    if settings.TORCH_NUM_THREADS > 0:
+        torch.set_num_threads(settings.TORCH_NUM_THREADS)
+    if settings.TORCH_NUM_INTEROP_THREADS > 0:
+        try:
+            torch.set_num_interop_threads(settings.TORCH_NUM_INTEROP_THREADS)
+        except RuntimeError as e:
+            # Only allowed before any inter-op parallel work has started
+            print(f"Could not set torch inter-op threads: {e}")
+    print(f"Torch threads: intra-op {torch.get_num_threads()}, inter-op {torch.get_num_interop_threads()}")
+
+def _quantize_int8(model):
+    """Dynamically quantise Linear layers to int8 weights."""
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _load_onnx(model_name: str, seq2seq: bool = False):
+    """Load an ONNX Runtime model, exporting it on first use.
+    
+    With ``INFERENCE_ONNX_DIR`` set, exports are saved there and reused by
+    later processes instead of re-exporting at every start.
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTModelForSeq2SeqLM
+    except ImportError:
+        raise ImportError("INFERENCE_BACKEND=onnx requires optimum: pip install optimum[onnxruntime]")
+    
+    model_class = ORTModelForSeq2SeqLM if seq2seq else ORTModelForFeatureExtraction
+    
+    if not settings.INFERENCE_ONNX_DIR:
+        return model_class.from_pretrained(model_name, export=True)
+    
+    kind = "seq2seq" if seq2seq else "features"
+    export_dir = os.path.join(settings.INFERENCE_ONNX_DIR, f"{model_name.replace('/', '--')}--{kind}")
+    if os.path.isdir(export_dir):
+        return model_class.from_pretrained(export_dir)
+    
+    model = model_class.from_pretrained(model_name, export=True)
+    model.save_pretrained(export_dir)
+    return model
+
+def _model_bytes(model) -> int:
+    """Parameter and buffer bytes of a model or a pipeline's model.
+    
+    Only torch tensors are counted, so int8 packed weights and ONNX Runtime
+    sessions report less than they actually use.
+    """
+    module = getattr(model, "model", model)
+    if not isinstance(module, torch.nn.Module):
+        return 0
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
 
 def get_model_manager():
     return ModelManager()
\ No newline at end of file
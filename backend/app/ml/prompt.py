@@ -4,11 +4,19 @@ def create_prompt(
     topic: str, 
     keywords: List[str], 
     contexts: List[str], 
-    customization: Optional[Dict[str, Any]] = None
+    customization: Optional[Dict[str, Any]] = None,
+    single_idea: bool = False
 ) -> str:
-    """Create a prompt for idea generation."""
+    """Create a prompt for idea generation.
+    
+    With ``single_idea`` the prompt asks for exactly one idea, for use with
+    ``num_return_sequences`` where each returned sequence is one idea.
+    """
     # Base prompt template
-    prompt = f"Generate creative and innovative ideas related to '{topic}'"
+    if single_idea:
+        prompt = f"Generate a creative and innovative idea related to '{topic}'"
+    else:
+        prompt = f"Generate creative and innovative ideas related to '{topic}'"
     
     if keywords:
         prompt += f" using these keywords: {', '.join(keywords)}"
@@ -40,7 +48,10 @@ def create_prompt(
         prompt += ". Provide each idea with a title and a detailed description."
     
     # Additional instructions for better formatting
-    prompt += " Separate each idea with a blank line. Format each idea as 'Title: Description'."
+    if single_idea:
+        prompt += " Give one idea, formatted as 'Title: Description'."
+    else:
+        prompt += " Separate each idea with a blank line. Format each idea as 'Title: Description'."
     
     return prompt
 
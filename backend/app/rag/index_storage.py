@@ -0,0 +1,252 @@
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.i64"
+METADATA_FILE = "metadata.jsonl"
+TOMBSTONES_FILE = "tombstones.bin"
+MANIFEST_FILE = "manifest.json"
+
+class IndexStorage:
+    """Versioned on-disk layout for the local vector index.
+
+    ``<path>/CURRENT`` names the live version directory, which holds:
+
+    - ``vectors.f32``: row-major float32 vectors, append-only
+    - ``ids.i64``: idea ID of each row, append-only
+    - ``metadata.jsonl``: one JSON object per row (title, content, topic, ...)
+    - ``tombstones.bin``: little-endian bitmap, bit set = row deleted
+    - ``manifest.json``: format version, dimension, committed row count,
+      deleted row count and committed metadata length
+
+    Data files are written before the manifest, and the manifest is replaced
+    atomically, so readers only ever see rows up to a committed count.
+    Readers map the vector block read-only with ``numpy.memmap``; every
+    process on the host shares one page-cache copy. Compaction writes a new
+    version directory without deleted rows and switches ``CURRENT`` with an
+    atomic rename. Writers serialise on an ``flock`` over ``<path>/LOCK``;
+    methods other than ``compact`` expect the caller to hold it.
+    """
+
+    def __init__(self, path: str, dimension: int):
+        self.path = path
+        self.dimension = dimension
+        os.makedirs(path, exist_ok=True)
+
+        with self.lock():
+            if not os.path.exists(os.path.join(path, "CURRENT")):
+                self._create_version(self._version_name(1))
+                self._set_current(self._version_name(1))
+
+        manifest = self.read_manifest(self.current_version())
+        if manifest["dimension"] != dimension:
+            raise ValueError(
+                f"Index at {path} has dimension {manifest['dimension']}, expected {dimension}"
+            )
+
+    @staticmethod
+    def _version_name(number: int) -> str:
+        return f"v{number:06d}"
+
+    def _file(self, version: str, name: str) -> str:
+        return os.path.join(self.path, version, name)
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Hold the cross-process writer lock."""
+        with open(os.path.join(self.path, "LOCK"), "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Versions and manifests
+
+    def current_version(self) -> str:
+        with open(os.path.join(self.path, "CURRENT")) as f:
+            return f.read().strip()
+
+    def _set_current(self, version: str):
+        tmp_path = os.path.join(self.path, "CURRENT.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, "CURRENT"))
+
+    def _create_version(self, version: str):
+        os.makedirs(os.path.join(self.path, version), exist_ok=True)
+        for name in (VECTORS_FILE, IDS_FILE, METADATA_FILE, TOMBSTONES_FILE):
+            open(self._file(version, name), "wb").close()
+        self._write_manifest(version, {
+            "format_version": FORMAT_VERSION,
+            "dimension": self.dimension,
+            "dtype": "float32",
+            "count": 0,
+            "deleted": 0,
+            "metadata_bytes": 0
+        })
+
+    def read_manifest(self, version: str) -> Dict[str, Any]:
+        with open(self._file(version, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format version: {manifest.get('format_version')}")
+        return manifest
+
+    def _write_manifest(self, version: str, manifest: Dict[str, Any]):
+        path = self._file(version, MANIFEST_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def signature(self, version: str) -> Tuple[int, int]:
+        """Cheap change marker: the manifest is replaced on every write."""
+        stat = os.stat(self._file(version, MANIFEST_FILE))
+        return stat.st_ino, stat.st_mtime_ns
+
+    # Reads
+
+    def open_vectors(self, version: str, count: int) -> np.ndarray:
+        if count == 0:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.memmap(self._file(version, VECTORS_FILE), dtype=np.float32, mode="r",
+                         shape=(count, self.dimension))
+
+    def open_ids(self, version: str, count: int) -> np.ndarray:
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.memmap(self._file(version, IDS_FILE), dtype=np.int64, mode="r", shape=(count,))
+
+    def read_tombstones(self, version: str, count: int) -> np.ndarray:
+        """Boolean array, True where the row is deleted."""
+        bits = np.fromfile(self._file(version, TOMBSTONES_FILE), dtype=np.uint8, count=(count + 7) // 8)
+        return np.unpackbits(bits, count=count, bitorder="little").astype(bool)
+
+    def read_metadata(self, version: str, offset: int, rows: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Read ``rows`` metadata records starting at byte ``offset``."""
+        records = []
+        with open(self._file(version, METADATA_FILE), "rb") as f:
+            f.seek(offset)
+            for _ in range(rows):
+                records.append(json.loads(f.readline()))
+            return records, f.tell()
+
+    # Writes (caller holds the lock)
+
+    def append(self, version: str, vectors: np.ndarray, ids: np.ndarray, records: List[Dict[str, Any]]):
+        manifest = self.read_manifest(version)
+        count = manifest["count"]
+        new_count = count + len(ids)
+
+        # Drop anything left behind by a writer that died before committing
+        self._truncate(version, count, manifest["metadata_bytes"])
+
+        with open(self._file(version, VECTORS_FILE), "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            os.fsync(f.fileno())
+        with open(self._file(version, IDS_FILE), "ab") as f:
+            f.write(np.ascontiguousarray(ids, dtype=np.int64).tobytes())
+            os.fsync(f.fileno())
+        with open(self._file(version, METADATA_FILE), "ab") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str).encode("utf-8") + b"\n")
+            os.fsync(f.fileno())
+            metadata_bytes = f.tell()
+        with open(self._file(version, TOMBSTONES_FILE), "r+b") as f:
+            f.truncate((new_count + 7) // 8)
+            os.fsync(f.fileno())
+
+        manifest["count"] = new_count
+        manifest["metadata_bytes"] = metadata_bytes
+        self._write_manifest(version, manifest)
+
+    def _truncate(self, version: str, count: int, metadata_bytes: int):
+        with open(self._file(version, VECTORS_FILE), "r+b") as f:
+            f.truncate(count * self.dimension * 4)
+        with open(self._file(version, IDS_FILE), "r+b") as f:
+            f.truncate(count * 8)
+        with open(self._file(version, METADATA_FILE), "r+b") as f:
+            f.truncate(metadata_bytes)
+
+    def mark_deleted(self, version: str, rows: List[int]):
+        if not rows:
+            return
+
+        manifest = self.read_manifest(version)
+        bitmap = np.memmap(self._file(version, TOMBSTONES_FILE), dtype=np.uint8, mode="r+",
+                           shape=((manifest["count"] + 7) // 8,))
+        newly_deleted = 0
+        for row in rows:
+            byte, bit = divmod(row, 8)
+            if not bitmap[byte] & (1 << bit):
+                bitmap[byte] |= (1 << bit)
+                newly_deleted += 1
+        bitmap.flush()
+        del bitmap
+
+        manifest["deleted"] += newly_deleted
+        self._write_manifest(version, manifest)
+
+    def compact(self, chunk_rows: int = 65536) -> str:
+        """Rewrite the live version without deleted rows and swap it in."""
+        with self.lock():
+            version = self.current_version()
+            manifest = self.read_manifest(version)
+            count = manifest["count"]
+
+            new_version = self._version_name(int(version[1:]) + 1)
+            if os.path.exists(os.path.join(self.path, new_version)):
+                shutil.rmtree(os.path.join(self.path, new_version))
+            self._create_version(new_version)
+
+            if count:
+                deleted = self.read_tombstones(version, count)
+                vectors = self.open_vectors(version, count)
+                ids = self.open_ids(version, count)
+
+                with open(self._file(version, METADATA_FILE), "rb") as src, \
+                        open(self._file(new_version, VECTORS_FILE), "ab") as vectors_out, \
+                        open(self._file(new_version, IDS_FILE), "ab") as ids_out, \
+                        open(self._file(new_version, METADATA_FILE), "ab") as metadata_out:
+                    for start in range(0, count, chunk_rows):
+                        end = min(start + chunk_rows, count)
+                        live = ~deleted[start:end]
+                        vectors_out.write(np.ascontiguousarray(vectors[start:end][live]).tobytes())
+                        ids_out.write(np.ascontiguousarray(ids[start:end][live]).tobytes())
+                        for keep in live:
+                            line = src.readline()
+                            if keep:
+                                metadata_out.write(line)
+                    for f in (vectors_out, ids_out, metadata_out):
+                        f.flush()
+                        os.fsync(f.fileno())
+                    metadata_bytes = metadata_out.tell()
+
+                live_count = int(count - deleted.sum())
+                with open(self._file(new_version, TOMBSTONES_FILE), "r+b") as f:
+                    f.truncate((live_count + 7) // 8)
+
+                new_manifest = self.read_manifest(new_version)
+                new_manifest["count"] = live_count
+                new_manifest["metadata_bytes"] = metadata_bytes
+                self._write_manifest(new_version, new_manifest)
+
+            self._set_current(new_version)
+
+            # Processes that still map the old files keep them alive until they reload
+            shutil.rmtree(os.path.join(self.path, version), ignore_errors=True)
+
+        return new_version
\ No newline at end of file
@@ -1,115 +1,133 @@
-from typing import Dict, Any, List, Optional, Union
+from typing import Callable, Dict, Any, List, Optional, Union
 import numpy as np
 
-from app.db.session import DBSession
-from app.ml.embeddings import generate_embedding
+from app.core.metrics import time_stage
+from app.ml.embeddings import generate_embedding, batch_generate_embeddings
+from app.rag.vector_store import get_vector_store
 
 class DocumentIndexer:
     """Handles indexing of documents in the vector database."""
-    
+
     def __init__(self):
-        db_session = DBSession()
-        self.supabase = db_session.get_supabase_client()
-    
-    def index_document(self, 
-                      idea_id: int, 
-                      title: str, 
-                      content: str, 
+        self.store = get_vector_store()
+
+    def index_document(self,
+                      idea_id: int,
+                      title: str,
+                      content: str,
                       metadata: Optional[Dict[str, Any]] = None) -> bool:
         """Index a document in the vector database."""
+        return self.batch_index_documents([{
+            "idea_id": idea_id,
+            "title": title,
+            "content": content,
+            "metadata": metadata
+        }])[0]
+
+    def batch_index_documents(self, documents: List[Dict[str, Any]]) -> List[bool]:
+        """Index multiple documents in batch."""
+        if not documents:
+            return []
+
         try:
-            # Combine text for embedding generation
-            text_to_embed = f"{title} {content}"
-            embedding = generate_embedding(text_to_embed)
-            
-            # Prepare data for insertion
+            self.upsert_documents(documents)
+            return [True] * len(documents)
+
+        except Exception as e:
+            print(f"Error batch indexing documents: {e}")
+            return [False] * len(documents)
+
+    def upsert_documents(self,
+                         documents: List[Dict[str, Any]],
+                         batch_size: Optional[int] = None,
+                         embed: Optional[Callable[[List[str]], List[np.ndarray]]] = None) -> None:
+        """Embed and upsert documents, raising on failure.
+
+        ``embed`` replaces the batched encode, e.g. to run it on the
+        embedding executor from another thread.
+        """
+        if not documents:
+            return
+
+        # Embed every document with batched forward passes
+        texts = [f"{doc['title']} {doc['content']}" for doc in documents]
+        if embed is not None:
+            embeddings = embed(texts)
+        else:
+            embeddings = batch_generate_embeddings(texts, batch_size=batch_size)
+
+        records = []
+        for doc, embedding in zip(documents, embeddings):
             data = {
-                "idea_id": idea_id,
-                "title": title,
-                "content": content,
-                "embedding": embedding.tolist()
+                "idea_id": doc["idea_id"],
+                "title": doc["title"],
+                "content": doc["content"],
+                "embedding": embedding
             }
-            
+
             # Add metadata if provided
-            if metadata:
-                for key, value in metadata.items():
+            if doc.get("metadata"):
+                for key, value in doc["metadata"].items():
                     data[key] = value
-            
-            # Insert into Supabase
-            response = self.supabase.table("idea_embeddings").insert(data).execute()
-            
-            return True if hasattr(response, 'data') else False
-        
-        except Exception as e:
-            print(f"Error indexing document: {e}")
-            return False
-    
-    def batch_index_documents(self, documents: List[Dict[str, Any]]) -> List[bool]:
-        """Index multiple documents in batch."""
-        results = []
-        for doc in documents:
-            success = self.index_document(
-                doc["idea_id"],
-                doc["title"],
-                doc["content"],
-                doc.get("metadata")
-            )
-            results.append(success)
-        return results
-    
-    def update_document(self, 
-                       idea_id: int, 
-                       title: Optional[str] = None, 
+
+            records.append(data)
+
+        # Write all records to the vector store in one call; upserting
+        # makes re-indexing the same ideas safe
+        with time_stage("index_write"):
+            self.store.upsert(records)
+
+    def update_document(self,
+                       idea_id: int,
+                       title: Optional[str] = None,
                        content: Optional[str] = None,
                        metadata: Optional[Dict[str, Any]] = None) -> bool:
         """Update an existing document in the vector database."""
         try:
             # Fetch existing document
-            response = self.supabase.table("idea_embeddings").select("*").eq("idea_id", idea_id).execute()
-            
-            if not hasattr(response, 'data') or len(response.data) == 0:
+            current_doc = self.store.get(idea_id)
+
+            if current_doc is None:
                 return False
-            
+
             # Prepare update data
             update_data = {}
             if title is not None or content is not None:
                 # Get current values if not provided
-                current_doc = response.data[0]
                 current_title = current_doc.get("title", "")
                 current_content = current_doc.get("content", "")
-                
+
                 title = title if title is not None else current_title
                 content = content if content is not None else current_content
-                
+
                 # Generate new embedding
                 text_to_embed = f"{title} {content}"
-                embedding = generate_embedding(text_to_embed)
-                
+                embedding = generate_embedding(text_to_embed, use_cache=False)
+
                 update_data["title"] = title
                 update_data["content"] = content
-                update_data["embedding"] = embedding.tolist()
-            
+                update_data["embedding"] = embedding
+
             # Add metadata updates if provided
             if metadata:
                 for key, value in metadata.items():
                     update_data[key] = value
-            
+
             # Update document
             if update_data:
-                response = self.supabase.table("idea_embeddings").update(update_data).eq("idea_id", idea_id).execute()
-                return True if hasattr(response, 'data') else False
-            
+                return self.store.update(idea_id, update_data)
+
             return True  # Nothing to update
-            
+
         except Exception as e:
             print(f"Error updating document: {e}")
             return False
-    
+
     def delete_document(self, idea_id: int) -> bool:
         """Delete a document from the vector database."""
         try:
-            response = self.supabase.table("idea_embeddings").delete().eq("idea_id", idea_id).execute()
-            return True if hasattr(response, 'data') else False
+            self.store.delete(idea_id)
+            return True
         except Exception as e:
             print(f"Error deleting document: {e}")
             return False
\ No newline at end of file
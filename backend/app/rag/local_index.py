@@ -0,0 +1,419 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from app.core.config import settings
+from app.ml.embeddings import top_k_similarity
+from app.rag.index_storage import IndexStorage
+from app.rag.vector_store import VectorStore
+
+try:
+    import hnswlib
+except ImportError:  # Optional dependency; exact search is used without it
+    hnswlib = None
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store over a contiguous float32 matrix.
+
+    Rows are append-only: deleting or re-embedding a record tombstones its
+    old row. Small corpora are searched exactly with one matrix-vector
+    product; once the live row count reaches ``ann_threshold`` (and
+    ``hnswlib`` is installed) unfiltered queries go through an HNSW graph.
+    Filtered queries always use exact search over the rows that pass the
+    filter, found through an inverted index on metadata values.
+
+    With a ``path`` the store is backed by ``IndexStorage``: the vector block
+    is a read-only memmap shared by every worker on the host, writes go to
+    disk under a cross-process lock, and each process picks up the others'
+    writes (and compactions) before serving a request.
+    """
+
+    def __init__(self,
+                 dimension: int,
+                 initial_capacity: int = 1024,
+                 ann_threshold: Optional[int] = None,
+                 path: Optional[str] = None):
+        self.dimension = dimension
+        self.ann_threshold = ann_threshold if ann_threshold is not None else settings.LOCAL_INDEX_ANN_THRESHOLD
+        self._lock = threading.RLock()
+        self._storage = IndexStorage(path, dimension) if path else None
+        self._compactor: Optional[threading.Thread] = None
+
+        if self._storage is None:
+            self._reset(
+                vectors=np.zeros((initial_capacity, dimension), dtype=np.float32),
+                ids=np.full(initial_capacity, -1, dtype=np.int64),
+                alive=np.zeros(initial_capacity, dtype=bool),
+                records=[],
+                size=0
+            )
+        else:
+            self._reload()
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def _reset(self, vectors: np.ndarray, ids: np.ndarray, alive: np.ndarray,
+               records: List[Dict[str, Any]], size: int):
+        self._vectors = vectors
+        self._ids = ids
+        self._alive = alive
+        self._records: List[Dict[str, Any]] = records
+        self._row_of: Dict[int, int] = {}
+        self._postings: Dict[str, Dict[Any, Set[int]]] = {}
+        self._size = size
+        self._hnsw = None
+
+        for row in np.flatnonzero(alive[:size]):
+            self._row_of[int(ids[row])] = int(row)
+            self._index_metadata(int(row))
+        self._maybe_build_ann()
+
+    # Writes
+
+    def add(self, records: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            if self._storage is None:
+                for record in records:
+                    self._append(record)
+                self._maybe_build_ann()
+                return
+
+            # Last write wins for duplicate IDs within one call
+            latest = {int(record["idea_id"]): record for record in records}
+            vectors = np.stack([self._normalize(record["embedding"]) for record in latest.values()])
+            ids = np.fromiter(latest.keys(), dtype=np.int64, count=len(latest))
+            metadata = [
+                {key: value for key, value in record.items() if key != "embedding"}
+                for record in latest.values()
+            ]
+
+            with self._storage.lock():
+                self._sync()
+                stale = [self._row_of[idea_id] for idea_id in latest if idea_id in self._row_of]
+                self._storage.mark_deleted(self._version, stale)
+                self._storage.append(self._version, vectors, ids, metadata)
+            self._sync()
+
+    def upsert(self, records: List[Dict[str, Any]]) -> None:
+        # add() already replaces existing IDs
+        self.add(records)
+
+    def update(self, idea_id: int, fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._sync()
+            row = self._row_of.get(idea_id)
+            if row is None:
+                return False
+
+            record = dict(self._records[row])
+            record.update(fields)
+
+            if "embedding" in fields:
+                record["embedding"] = fields["embedding"]
+            else:
+                record["embedding"] = np.array(self._vectors[row])
+
+            # Re-append so the vector block and postings stay consistent
+            self.add([record])
+            return True
+
+    def delete(self, idea_id: int) -> None:
+        with self._lock:
+            if self._storage is None:
+                row = self._row_of.get(idea_id)
+                if row is not None:
+                    self._tombstone(row)
+                return
+
+            with self._storage.lock():
+                self._sync()
+                row = self._row_of.get(idea_id)
+                if row is not None:
+                    self._storage.mark_deleted(self._version, [row])
+            self._sync()
+
+    def _normalize(self, embedding: Any) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dimension:
+            raise ValueError(f"Expected a {self.dimension}-dimensional embedding, got {vector.shape[0]}")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _append(self, record: Dict[str, Any]):
+        """Append one record to the in-memory matrix."""
+        idea_id = int(record["idea_id"])
+        if idea_id in self._row_of:
+            self._tombstone(self._row_of[idea_id])
+
+        if self._size == len(self._ids):
+            self._grow(max(1, 2 * len(self._ids)))
+
+        row = self._size
+        self._vectors[row] = self._normalize(record["embedding"])
+        self._ids[row] = idea_id
+        self._alive[row] = True
+        self._records.append({key: value for key, value in record.items() if key != "embedding"})
+        self._row_of[idea_id] = row
+        self._index_metadata(row)
+        self._size += 1
+        self._add_to_ann(row)
+
+    def _tombstone(self, row: int):
+        """Drop a row from the live set and every in-process lookup."""
+        self._alive[row] = False
+        idea_id = int(self._ids[row])
+        if self._row_of.get(idea_id) == row:
+            del self._row_of[idea_id]
+        for key, value in self._records[row].items():
+            for item in self._posting_values(value):
+                postings = self._postings.get(key, {}).get(item)
+                if postings is not None:
+                    postings.discard(row)
+        if self._hnsw is not None:
+            self._hnsw.mark_deleted(row)
+
+    def _grow(self, capacity: int):
+        vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.full(capacity, -1, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._vectors, self._ids, self._alive = vectors, ids, alive
+
+    # On-disk synchronisation
+
+    def _reload(self):
+        """Map the current on-disk version from scratch."""
+        for attempt in range(3):
+            version = self._storage.current_version()
+            try:
+                signature = self._storage.signature(version)
+                manifest = self._storage.read_manifest(version)
+                count = manifest["count"]
+                records, offset = self._storage.read_metadata(version, 0, count)
+                deleted = self._storage.read_tombstones(version, count)
+                vectors = self._storage.open_vectors(version, count)
+                ids = np.array(self._storage.open_ids(version, count))
+            except FileNotFoundError:
+                # A compaction swapped versions underneath us; retry
+                if attempt == 2:
+                    raise
+                continue
+            break
+
+        self._version = version
+        self._signature = signature
+        self._metadata_offset = offset
+        self._reset(vectors=vectors, ids=ids, alive=~deleted, records=records, size=count)
+
+    def _sync(self):
+        """Pick up rows, deletes and compactions written by any process."""
+        if self._storage is None:
+            return
+
+        version = self._storage.current_version()
+        if version != self._version:
+            self._reload()
+            return
+
+        try:
+            signature = self._storage.signature(version)
+        except FileNotFoundError:
+            self._reload()
+            return
+        if signature == self._signature:
+            return
+
+        manifest = self._storage.read_manifest(version)
+        count = manifest["count"]
+        deleted = self._storage.read_tombstones(version, count)
+
+        if count > self._size:
+            previous_size = self._size
+            records, self._metadata_offset = self._storage.read_metadata(
+                version, self._metadata_offset, count - previous_size
+            )
+            new_ids = np.array(self._storage.open_ids(version, count)[previous_size:])
+            self._vectors = self._storage.open_vectors(version, count)
+            self._ids = np.concatenate([self._ids[:previous_size], new_ids])
+            self._alive = np.concatenate([self._alive[:previous_size], np.zeros(count - previous_size, dtype=bool)])
+            self._records.extend(records)
+
+            for row in range(previous_size, count):
+                if deleted[row]:
+                    continue
+                idea_id = int(self._ids[row])
+                if idea_id in self._row_of:
+                    self._tombstone(self._row_of[idea_id])
+                self._alive[row] = True
+                self._row_of[idea_id] = row
+                self._index_metadata(row)
+            self._size = count
+
+            if self._hnsw is not None:
+                if count > self._hnsw.get_max_elements():
+                    self._hnsw.resize_index(max(count, 2 * self._hnsw.get_max_elements()))
+                new_rows = np.flatnonzero(self._alive[previous_size:count]) + previous_size
+                if new_rows.size:
+                    self._hnsw.add_items(self._vectors[new_rows], new_rows)
+            else:
+                self._maybe_build_ann()
+
+        for row in np.flatnonzero(self._alive[:count] & deleted):
+            self._tombstone(int(row))
+
+        self._signature = signature
+
+    def compact(self):
+        """Rewrite the on-disk index without deleted rows and remap it."""
+        if self._storage is None:
+            return
+        self._storage.compact()
+        with self._lock:
+            self._sync()
+
+    def start_background_compaction(self, interval: float, min_deleted_ratio: float):
+        """Compact from a daemon thread whenever enough rows are deleted."""
+        if self._storage is None or self._compactor is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    manifest = self._storage.read_manifest(self._storage.current_version())
+                    if manifest["count"] and manifest["deleted"] / manifest["count"] >= min_deleted_ratio:
+                        self.compact()
+                except Exception as e:
+                    print(f"Error compacting local index: {e}")
+
+        self._compactor = threading.Thread(target=run, name="local-index-compactor", daemon=True)
+        self._compactor.start()
+
+    # Metadata filters
+
+    @staticmethod
+    def _posting_values(value: Any) -> List[Any]:
+        values = value if isinstance(value, (list, tuple)) else [value]
+        return [item for item in values if isinstance(item, (str, int, float, bool))]
+
+    def _index_metadata(self, row: int):
+        for key, value in self._records[row].items():
+            if key in ("idea_id", "title", "content"):
+                continue
+            for item in self._posting_values(value):
+                self._postings.setdefault(key, {}).setdefault(item, set()).add(row)
+
+    def _filter_rows(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Rows matching every filter.
+
+        A scalar filter matches records whose value equals it or, for list
+        columns such as ``keywords``, contains it. A list filter matches any
+        of its values.
+        """
+        rows: Optional[Set[int]] = None
+        for key, wanted in filters.items():
+            matched: Set[int] = set()
+            for item in self._posting_values(wanted):
+                matched |= self._postings.get(key, {}).get(item, set())
+            rows = matched if rows is None else rows & matched
+            if not rows:
+                break
+        return np.fromiter(sorted(rows or ()), dtype=np.int64)
+
+    # Reads
+
+    def search(self,
+               query_embedding: np.ndarray,
+               top_k: int,
+               similarity_threshold: float,
+               filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        with self._lock:
+            self._sync()
+            if not self._row_of or top_k <= 0:
+                return []
+
+            if self._hnsw is not None and not filters:
+                k = min(top_k, len(self._row_of))
+                labels, distances = self._hnsw.knn_query(query, k=k)
+                rows = labels[0].astype(np.int64)
+                scores = 1.0 - distances[0]
+            elif filters:
+                candidates = self._filter_rows(filters)
+                if candidates.size == 0:
+                    return []
+                top, scores = top_k_similarity(
+                    query, self._vectors[candidates], top_k,
+                    threshold=similarity_threshold, normalized=True
+                )
+                rows = candidates[top]
+            else:
+                rows, scores = top_k_similarity(
+                    query, self._vectors[:self._size], top_k,
+                    threshold=similarity_threshold,
+                    candidate_mask=self._alive[:self._size],
+                    normalized=True
+                )
+
+            keep = scores >= similarity_threshold
+            return [self._result(int(row), float(score)) for row, score in zip(rows[keep], scores[keep])]
+
+    def _result(self, row: int, score: float) -> Dict[str, Any]:
+        result = dict(self._records[row])
+        result["id"] = int(self._ids[row])
+        result["similarity_score"] = score
+        return result
+
+    def get(self, idea_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._sync()
+            row = self._row_of.get(idea_id)
+            if row is None:
+                return None
+            record = dict(self._records[row])
+            record["embedding"] = np.array(self._vectors[row])
+            return record
+
+    def get_embedding(self, idea_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            self._sync()
+            row = self._row_of.get(idea_id)
+            return np.array(self._vectors[row]) if row is not None else None
+
+    def ping(self) -> None:
+        # In memory there is nothing to reach; on disk, make sure the current version still maps
+        with self._lock:
+            self._sync()
+
+    # Approximate search
+
+    def _maybe_build_ann(self):
+        if hnswlib is None or self._hnsw is not None or len(self._row_of) < self.ann_threshold:
+            return
+
+        index = hnswlib.Index(space="ip", dim=self.dimension)
+        index.init_index(
+            max_elements=max(len(self._ids), 1),
+            ef_construction=settings.LOCAL_INDEX_HNSW_EF_CONSTRUCTION,
+            M=settings.LOCAL_INDEX_HNSW_M
+        )
+        live = np.flatnonzero(self._alive[:self._size])
+        index.add_items(self._vectors[live], live)
+        index.set_ef(settings.LOCAL_INDEX_HNSW_EF_SEARCH)
+        self._hnsw = index
+
+    def _add_to_ann(self, row: int):
+        if self._hnsw is None:
+            return
+        if self._size > self._hnsw.get_max_elements():
+            self._hnsw.resize_index(len(self._ids))
+        self._hnsw.add_items(self._vectors[row:row + 1], np.array([row]))
\ No newline at end of file
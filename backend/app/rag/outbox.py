@@ -0,0 +1,249 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import DBSession, PostgresPool
+from app.ml.embeddings import batch_generate_embeddings
+from app.ml.executor import ExecutorSaturatedError, get_inference_executor
+from app.rag.indexer import DocumentIndexer
+
+# "index" and "update" re-embed the idea's current row; "delete" drops its vector
+OPERATIONS = ("index", "update", "delete")
+
+def enqueue_index_operations(cursor, operation: str, idea_ids: List[int]):
+    """Record pending vector store work in the caller's transaction."""
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown outbox operation: {operation}")
+    if not idea_ids:
+        return
+
+    cursor.execute(
+        """
+        INSERT INTO index_outbox (idea_id, operation)
+        SELECT unnest(%s::int[]), %s
+        """,
+        (list(idea_ids), operation)
+    )
+
+class OutboxDrainer:
+    """Applies pending ``index_outbox`` rows to the vector store in batches.
+
+    Rows are claimed with ``FOR UPDATE SKIP LOCKED``, so the in-app worker
+    and ``scripts/drain_outbox.py`` can run side by side. When an idea has
+    several pending rows only the newest operation is applied. A batch that
+    fails is retried with exponential backoff; rows that have failed
+    ``max_attempts`` times are left in the table as dead and reported in
+    the stats. ``embed`` is passed through to ``upsert_documents``.
+    """
+
+    def __init__(self,
+                 pg_pool: Optional[PostgresPool] = None,
+                 batch_size: Optional[int] = None,
+                 max_attempts: Optional[int] = None,
+                 embed: Optional[Callable[[List[str]], List[np.ndarray]]] = None):
+        self.pg_pool = pg_pool or DBSession().get_postgres_pool()
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+        self.embed = embed
+        self.indexer = DocumentIndexer()
+
+        # Stats
+        self._processed = 0
+        self._failed_batches = 0
+        self._last_drain: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    def drain_once(self) -> int:
+        """Claim and apply one batch. Returns the number of rows completed."""
+        with self.pg_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, idea_id, operation
+                FROM index_outbox
+                WHERE attempts < %s AND next_attempt_at <= now()
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+                """,
+                (self.max_attempts, self.batch_size)
+            )
+            rows = cursor.fetchall()
+            self._last_drain = time.time()
+            if not rows:
+                conn.commit()
+                return 0
+
+            row_ids = [row["id"] for row in rows]
+
+            # Rows are ordered by id, so the newest operation per idea wins
+            latest = {row["idea_id"]: row["operation"] for row in rows}
+
+            try:
+                self._apply(cursor, latest)
+            except ExecutorSaturatedError:
+                # Busy, not broken: release the rows without counting an attempt
+                conn.rollback()
+                return 0
+            except Exception as e:
+                print(f"Error applying {len(rows)} outbox rows: {e}")
+                self._failed_batches += 1
+                self._last_error = str(e)
+                cursor.execute(
+                    """
+                    UPDATE index_outbox
+                    SET attempts = attempts + 1,
+                        last_error = %s,
+                        next_attempt_at = now() + LEAST(%s * power(2, attempts), %s) * interval '1 second'
+                    WHERE id = ANY(%s)
+                    """,
+                    (str(e)[:1000], settings.OUTBOX_BACKOFF_BASE, settings.OUTBOX_BACKOFF_MAX, row_ids)
+                )
+                conn.commit()
+                return 0
+
+            cursor.execute("DELETE FROM index_outbox WHERE id = ANY(%s)", (row_ids,))
+            conn.commit()
+
+        self._processed += len(rows)
+        return len(rows)
+
+    def _apply(self, cursor, latest: Dict[int, str]):
+        to_index = [idea_id for idea_id, operation in latest.items() if operation != "delete"]
+        to_delete = [idea_id for idea_id, operation in latest.items() if operation == "delete"]
+
+        if to_index:
+            # Index what is committed now; ideas deleted since have a delete row
+            cursor.execute(
+                "SELECT id, title, description, topic, keywords FROM ideas WHERE id = ANY(%s)",
+                (to_index,)
+            )
+            self.indexer.upsert_documents([
+                {
+                    "idea_id": idea["id"],
+                    "title": idea["title"],
+                    "content": idea["description"],
+                    "metadata": {
+                        "topic": idea["topic"],
+                        "keywords": idea["keywords"]
+                    }
+                }
+                for idea in cursor.fetchall()
+            ], embed=self.embed)
+
+        for idea_id in to_delete:
+            self.indexer.store.delete(idea_id)
+
+    def drain(self, max_batches: Optional[int] = None) -> int:
+        """Drain until nothing is ready (or ``max_batches`` batches ran)."""
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            processed = self.drain_once()
+            total += processed
+            batches += 1
+            if processed < self.batch_size:
+                break
+        return total
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return backlog, dead rows and lag from the table plus drain counters."""
+        with self.pg_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT
+                    count(*) FILTER (WHERE attempts < %s) AS backlog,
+                    count(*) FILTER (WHERE attempts >= %s) AS dead,
+                    count(*) FILTER (WHERE attempts > 0 AND attempts < %s) AS retrying,
+                    EXTRACT(EPOCH FROM now() - min(created_at) FILTER (WHERE attempts < %s)) AS lag_seconds
+                FROM index_outbox
+                """,
+                (self.max_attempts,) * 4
+            )
+            row = cursor.fetchone()
+            conn.commit()
+
+        return {
+            "backlog": row["backlog"],
+            "dead": row["dead"],
+            "retrying": row["retrying"],
+            "lag_seconds": float(row["lag_seconds"] or 0.0),
+            "processed": self._processed,
+            "failed_batches": self._failed_batches,
+            "last_drain": self._last_drain,
+            "last_error": self._last_error
+        }
+
+class OutboxWorker:
+    """Drains the outbox from inside the app.
+
+    Polls every ``OUTBOX_POLL_INTERVAL`` seconds, or right away after
+    ``notify``, and keeps going while full batches come back. Batches run on
+    a thread of their own, so row locks and vector store round-trips never
+    hold up request traffic; only the encode step is sent to the embedding
+    inference executor, where it queues with search embeddings. When that
+    is saturated the batch is released and retried on the next tick.
+    """
+
+    def __init__(self, drainer: Optional[OutboxDrainer] = None, poll_interval: Optional[float] = None):
+        self.drainer = drainer or OutboxDrainer(embed=self._embed)
+        self.poll_interval = poll_interval if poll_interval is not None else settings.OUTBOX_POLL_INTERVAL
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._loop = asyncio.get_running_loop()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """Wake the worker after new rows were committed."""
+        self._wake.set()
+
+    def _embed(self, texts: List[str]) -> List[np.ndarray]:
+        # Called from the worker thread; the executor lives on the event loop
+        future = asyncio.run_coroutine_threadsafe(
+            get_inference_executor("embedding").run(batch_generate_embeddings, texts),
+            self._loop
+        )
+        return future.result()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                processed = self.drainer.drain_once()
+            except Exception as e:
+                print(f"Error draining index outbox: {e}")
+                processed = 0
+
+            if processed >= self.drainer.batch_size:
+                continue
+
+            self._wake.wait(self.poll_interval)
+
+    async def stop(self):
+        """Stop the worker once its current batch is done."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            await run_in_threadpool(self._thread.join, 10.0)
+            self._thread = None
+
+_outbox_worker: Optional[OutboxWorker] = None
+
+def get_outbox_worker() -> OutboxWorker:
+    global _outbox_worker
+    if _outbox_worker is None:
+        _outbox_worker = OutboxWorker()
+    return _outbox_worker
\ No newline at end of file
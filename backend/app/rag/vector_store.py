@@ -0,0 +1,181 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.session import DBSession
+
+class VectorStore(ABC):
+    """Storage backend for idea embeddings.
+
+    Records are dicts with ``idea_id``, ``title``, ``content`` and
+    ``embedding`` plus any metadata columns (``topic``, ``keywords``, ...).
+    Search results use the same shape as the Supabase ``match_documents`` RPC
+    so routes don't care which backend answered. Backends raise on failure;
+    callers decide how to report it.
+    """
+
+    @abstractmethod
+    def add(self, records: List[Dict[str, Any]]) -> None:
+        """Add records to the store."""
+
+    @abstractmethod
+    def upsert(self, records: List[Dict[str, Any]]) -> None:
+        """Add records, replacing any existing record with the same idea ID."""
+
+    @abstractmethod
+    def update(self, idea_id: int, fields: Dict[str, Any]) -> bool:
+        """Update fields of an existing record. Returns False if it is missing."""
+
+    @abstractmethod
+    def delete(self, idea_id: int) -> None:
+        """Remove a record from the store."""
+
+    @abstractmethod
+    def search(self,
+               query_embedding: np.ndarray,
+               top_k: int,
+               similarity_threshold: float,
+               filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` records most similar to the query."""
+
+    @abstractmethod
+    def get(self, idea_id: int) -> Optional[Dict[str, Any]]:
+        """Get a record by idea ID."""
+
+    @abstractmethod
+    def get_embedding(self, idea_id: int) -> Optional[np.ndarray]:
+        """Get the stored embedding for an idea."""
+
+    @abstractmethod
+    def ping(self) -> None:
+        """Cheap reachability check for readiness probes; raises if the store is unusable."""
+
+class SupabaseVectorStore(VectorStore):
+    """Vector store backed by the Supabase ``idea_embeddings`` table."""
+
+    table_name = "idea_embeddings"
+
+    def __init__(self):
+        self.supabase = DBSession().get_supabase_client()
+        self._warned_no_unique_index = False
+
+    @staticmethod
+    def _serialize(record: Dict[str, Any]) -> Dict[str, Any]:
+        data = dict(record)
+        if isinstance(data.get("embedding"), np.ndarray):
+            data["embedding"] = data["embedding"].tolist()
+        return data
+
+    def add(self, records: List[Dict[str, Any]]) -> None:
+        if records:
+            self.supabase.table(self.table_name).insert([self._serialize(r) for r in records]).execute()
+
+    def upsert(self, records: List[Dict[str, Any]]) -> None:
+        # Conflicting on idea_id needs the unique index from
+        # scripts/supabase_idea_embeddings.sql
+        if not records:
+            return
+
+        rows = [self._serialize(r) for r in records]
+        try:
+            self.supabase.table(self.table_name).upsert(rows, on_conflict="idea_id").execute()
+        except Exception as e:
+            # 42P10: no unique constraint matches ON CONFLICT (table not migrated yet)
+            if getattr(e, "code", None) != "42P10":
+                raise
+            if not self._warned_no_unique_index:
+                print("idea_embeddings has no unique index on idea_id; run scripts/supabase_idea_embeddings.sql")
+                self._warned_no_unique_index = True
+
+            # Replace the ideas' rows instead; not atomic, but never duplicates
+            idea_ids = [row["idea_id"] for row in rows]
+            self.supabase.table(self.table_name).delete().in_("idea_id", idea_ids).execute()
+            self.supabase.table(self.table_name).insert(rows).execute()
+
+    def update(self, idea_id: int, fields: Dict[str, Any]) -> bool:
+        response = self.supabase.table(self.table_name).update(self._serialize(fields)).eq("idea_id", idea_id).execute()
+        return True if hasattr(response, 'data') else False
+
+    def delete(self, idea_id: int) -> None:
+        self.supabase.table(self.table_name).delete().eq("idea_id", idea_id).execute()
+
+    def search(self,
+               query_embedding: np.ndarray,
+               top_k: int,
+               similarity_threshold: float,
+               filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        # Prepare filter params if provided
+        filter_params = {}
+        if filters:
+            filter_params["filters"] = filters
+
+        response = self.supabase.rpc(
+            "match_documents",
+            {
+                "query_embedding": query_embedding.tolist(),
+                "match_threshold": similarity_threshold,
+                "match_count": top_k,
+                "table_name": self.table_name,
+                **filter_params
+            }
+        ).execute()
+
+        return response.data if hasattr(response, 'data') else []
+
+    def get(self, idea_id: int) -> Optional[Dict[str, Any]]:
+        response = self.supabase.table(self.table_name).select("*").eq("idea_id", idea_id).execute()
+
+        if hasattr(response, 'data') and len(response.data) > 0:
+            return response.data[0]
+        return None
+
+    def get_embedding(self, idea_id: int) -> Optional[np.ndarray]:
+        response = self.supabase.table(self.table_name).select("embedding").eq("idea_id", idea_id).execute()
+
+        if not hasattr(response, 'data') or len(response.data) == 0:
+            return None
+
+        embedding = response.data[0].get("embedding")
+        if embedding is None:
+            return None
+
+        # pgvector columns come back from PostgREST as "[0.1,0.2,...]" strings
+        if isinstance(embedding, str):
+            embedding = json.loads(embedding)
+
+        return np.asarray(embedding, dtype=np.float32)
+
+    def ping(self) -> None:
+        self.supabase.table(self.table_name).select("idea_id").limit(1).execute()
+
+_vector_store: Optional[VectorStore] = None
+
+def get_vector_store() -> VectorStore:
+    """Get the configured vector store (``VECTOR_STORE_BACKEND``)."""
+    global _vector_store
+    if _vector_store is None:
+        if settings.VECTOR_STORE_BACKEND == "local":
+            # An in-memory index would be private to one worker process and lost on
+            # restart, while the outbox hands each idea to exactly one process
+            if not settings.LOCAL_INDEX_PATH:
+                raise ValueError("VECTOR_STORE_BACKEND=local requires LOCAL_INDEX_PATH")
+
+            from app.rag.local_index import LocalVectorStore
+            local_store = LocalVectorStore(
+                dimension=settings.EMBEDDING_DIMENSION,
+                path=settings.LOCAL_INDEX_PATH
+            )
+            if settings.LOCAL_INDEX_COMPACT_INTERVAL > 0:
+                local_store.start_background_compaction(
+                    settings.LOCAL_INDEX_COMPACT_INTERVAL,
+                    settings.LOCAL_INDEX_COMPACT_RATIO
+                )
+            _vector_store = local_store
+        elif settings.VECTOR_STORE_BACKEND == "supabase":
+            _vector_store = SupabaseVectorStore()
+        else:
+            raise ValueError(f"Unknown vector store backend: {settings.VECTOR_STORE_BACKEND}")
+    return _vector_store
\ No newline at end of file
@@ -0,0 +1,192 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.metrics import CACHE_REQUESTS
+
+class SQLiteCacheBackend:
+    """Shared cache tier backed by a local SQLite file.
+
+    Every uvicorn worker on a host can point at the same file, so an entry
+    computed by one worker is reused by the others. Every ``purge_every``
+    writes, expired rows are deleted and, past ``max_rows``, the rows
+    closest to expiry go too, so the file stays bounded.
+    """
+
+    def __init__(self, path: str, max_rows: int = 100000, purge_every: int = 1000):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.max_rows = max_rows
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at_idx ON cache(expires_at)")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), time.time() + ttl)
+            )
+            self._writes += 1
+            purge = self._writes % self.purge_every == 0
+
+        if purge:
+            self.purge_expired()
+
+    def purge_expired(self):
+        """Delete expired rows, then the soonest-expiring ones beyond ``max_rows``."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            excess = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_rows
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at LIMIT ?)",
+                    (excess,)
+                )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+class LRUTTLCache:
+    """Thread-safe in-process LRU cache with per-entry TTL and a memory budget.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or ``max_bytes`` (measured with ``sizeof``) is exceeded. An optional
+    ``shared_backend`` acts as a second tier; values are stored there through
+    ``serialize`` / ``deserialize``.
+    """
+
+    def __init__(self,
+                 max_entries: int,
+                 ttl_seconds: float,
+                 max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None,
+                 shared_backend: Optional[SQLiteCacheBackend] = None,
+                 serialize: Optional[Callable[[Any], bytes]] = None,
+                 deserialize: Optional[Callable[[bytes], Any]] = None,
+                 name: str = "default"):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda value: 0)
+        self._shared = shared_backend
+        self._serialize = serialize
+        self._deserialize = deserialize
+
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, size = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    CACHE_REQUESTS.inc(cache=self.name, result="hit")
+                    return value
+                self._remove(key)
+
+        if self._shared is not None:
+            try:
+                payload = self._shared.get(key)
+            except sqlite3.Error as e:
+                print(f"Error reading shared cache: {e}")
+                payload = None
+
+            if payload is not None:
+                value = self._deserialize(payload)
+                self._store(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                CACHE_REQUESTS.inc(cache=self.name, result="shared_hit")
+                return value
+
+        with self._lock:
+            self.misses += 1
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        return None
+
+    def set(self, key: str, value: Any):
+        self._store(key, value)
+
+        if self._shared is not None:
+            try:
+                self._shared.set(key, self._serialize(value), self.ttl)
+            except sqlite3.Error as e:
+                print(f"Error writing shared cache: {e}")
+
+    def _store(self, key: str, value: Any):
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, time.monotonic() + self.ttl, size)
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self._shared is not None:
+            self._shared.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "shared_backend": self._shared is not None
+            }
\ No newline at end of file
@@ -0,0 +1,54 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+class CachedProbe:
+    """Runs a dependency check at most once per ``ttl`` seconds.
+
+    Results, including failures, are reused until they expire, so a
+    readiness endpoint polled by the orchestrator and a load balancer costs
+    one check per TTL rather than one per poll. Checks are single-flight:
+    while one is running, other callers get the previous result instead of
+    piling onto a dependency that may be hanging.
+    """
+
+    def __init__(self, name: str, check: Callable[[], Any], ttl: float):
+        self.name = name
+        self.check = check
+        self.ttl = ttl
+        self._result: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def run(self) -> Dict[str, Any]:
+        """Return the cached result, refreshing it if it has expired."""
+        if self._result is not None and time.monotonic() < self._expires_at:
+            return self._result
+
+        # Only the first caller refreshes; the rest reuse the stale result
+        if not self._lock.acquire(blocking=self._result is None):
+            return self._result
+
+        try:
+            if self._result is not None and time.monotonic() < self._expires_at:
+                return self._result
+
+            start = time.perf_counter()
+            try:
+                self.check()
+                ok, error = True, None
+            except Exception as e:
+                ok, error = False, str(e) or type(e).__name__
+
+            self._result = {
+                "ok": ok,
+                "error": error,
+                "latency_ms": (time.perf_counter() - start) * 1000.0,
+                "checked_at": time.time()
+            }
+            self._expires_at = time.monotonic() + self.ttl
+            if not ok:
+                print(f"Readiness probe {self.name} failed: {error}")
+            return self._result
+        finally:
+            self._lock.release()
\ No newline at end of file
@@ -0,0 +1,17 @@
+from typing import Dict, Iterable
+
+def latency_summary_ms(durations: Iterable[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of durations given in seconds, in milliseconds."""
+    values = sorted(durations)
+
+    def percentile(p: float) -> float:
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(p * len(values)))] * 1000.0
+
+    return {
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": values[-1] * 1000.0 if values else 0.0
+    }
\ No newline at end of file
@@ -1,11 +1,19 @@
+import threading
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import register_routes
+from app.api.middlewares.metrics import add_metrics
 from app.api.middlewares.rate_limiter import add_rate_limiter
+from app.api.middlewares.scheduler import add_scheduler
 from app.core.config import settings
-from app.db.session import initialize_db
+from app.db.session import DBSession, PoolTimeoutError, initialize_db
+from app.ml.batcher import get_embedding_batcher
+from app.ml.executor import ExecutorSaturatedError, shutdown_executors
+from app.ml.model import get_model_manager
+from app.rag.outbox import get_outbox_worker
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -24,17 +32,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add per-class request scheduling; added first so rate limiting runs before it
+add_scheduler(app)
+
 # Add rate limiting middleware
 add_rate_limiter(app)
 
+# Record request latency; added last so it wraps everything above
+add_metrics(app)
+
 # Register all routes
 register_routes(app)
 
+# Shed load when an inference queue is full
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy. Please try again later."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy. Please try again later."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     # Initialize database connections and tables
     await initialize_db()
+    
+    # Load and warm up models in the background; readiness is reported once done
+    threading.Thread(
+        target=get_model_manager().preload,
+        kwargs={"warmup": settings.MODEL_WARMUP},
+        name="model-preload",
+        daemon=True
+    ).start()
+    
+    # Drain queued vector index operations
+    if settings.OUTBOX_WORKER_ENABLED:
+        get_outbox_worker().start()
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop the embedding batcher worker
+    await get_embedding_batcher().stop()
+    await get_outbox_worker().stop()
+    shutdown_executors()
+    DBSession().close()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=settings.PORT, reload=settings.DEBUG)
\ No newline at end of file
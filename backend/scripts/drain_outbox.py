@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from app.db.session import DBSession
+from app.rag.outbox import OutboxDrainer
+
+def drain_outbox(batch_size=None, follow=False, interval=5.0):
+    """Apply pending vector index operations from the index_outbox table.
+
+    Safe to run next to the app's own worker: rows are claimed with
+    SKIP LOCKED.
+    """
+    drainer = OutboxDrainer(batch_size=batch_size)
+
+    try:
+        while True:
+            start = time.perf_counter()
+            processed = drainer.drain()
+            elapsed = time.perf_counter() - start
+
+            stats = drainer.get_stats()
+            rate = processed / elapsed if elapsed > 0 else 0.0
+            print(
+                f"Processed {processed} rows ({rate:.1f}/s); "
+                f"backlog {stats['backlog']}, dead {stats['dead']}, lag {stats['lag_seconds']:.1f}s"
+            )
+
+            if not follow:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        DBSession().close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drain the vector index outbox")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows claimed per batch")
+    parser.add_argument("--follow", action="store_true", help="Keep polling instead of exiting when empty")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls with --follow")
+    args = parser.parse_args()
+
+    drain_outbox(batch_size=args.batch_size, follow=args.follow, interval=args.interval)
\ No newline at end of file
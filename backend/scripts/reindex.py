@@ -0,0 +1,310 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".reindex_checkpoint.json")
+
+# Per-process state; connections are opened by the first chunk
+_worker = {}
+
+def _init_worker(batch_size, target):
+    # Nothing that can fail here: an initializer that raises makes the pool
+    # respawn workers forever instead of reporting the error
+    _worker["batch_size"] = batch_size
+    _worker["target"] = target
+
+def _use_target(target):
+    """Point this process's vector store at ``target`` instead of the live index.
+
+    ``target`` is an index directory for the local backend and a table name
+    for Supabase.
+    """
+    from app.core.config import settings
+    from app.rag.vector_store import SupabaseVectorStore
+
+    if settings.VECTOR_STORE_BACKEND == "local":
+        settings.LOCAL_INDEX_PATH = target
+    else:
+        SupabaseVectorStore.table_name = target
+
+def _connect_worker():
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+    from app.core.config import settings
+    from app.rag.indexer import DocumentIndexer
+
+    if _worker["target"]:
+        _use_target(_worker["target"])
+    _worker["conn"] = psycopg2.connect(settings.NEON_DB_URL, cursor_factory=RealDictCursor)
+    _worker["indexer"] = DocumentIndexer()
+
+def _reindex_chunk(chunk):
+    """Fetch, embed and upsert the ideas with first_id <= id <= last_id."""
+    if "conn" not in _worker:
+        _connect_worker()
+
+    first_id, last_id = chunk
+    conn = _worker["conn"]
+
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT id, title, description, topic, keywords
+        FROM ideas
+        WHERE id BETWEEN %s AND %s
+        ORDER BY id
+        """,
+        (first_id, last_id)
+    )
+    ideas = cursor.fetchall()
+    conn.commit()
+    fetched = time.perf_counter()
+
+    _worker["indexer"].upsert_documents([
+        {
+            "idea_id": idea["id"],
+            "title": idea["title"],
+            "content": idea["description"],
+            "metadata": {
+                "topic": idea["topic"],
+                "keywords": idea["keywords"]
+            }
+        }
+        for idea in ideas
+    ], batch_size=_worker["batch_size"])
+
+    return {
+        "last_id": last_id,
+        "rows": len(ideas),
+        "fetch_seconds": fetched - start,
+        "index_seconds": time.perf_counter() - fetched
+    }
+
+def _iter_chunks(conn, after_id, chunk_size):
+    """Stream idea IDs with a server-side cursor and yield (first, last) ranges."""
+    cursor = conn.cursor(name="reindex_ids")
+    cursor.itersize = chunk_size
+    cursor.execute("SELECT id FROM ideas WHERE id > %s ORDER BY id", (after_id,))
+
+    first_id = None
+    count = 0
+    for row in cursor:
+        idea_id = row[0]
+        if first_id is None:
+            first_id = idea_id
+        count += 1
+        if count == chunk_size:
+            yield first_id, idea_id
+            first_id, count = None, 0
+
+    if first_id is not None:
+        yield first_id, idea_id
+
+def _load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _save_checkpoint(path, checkpoint):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _swap_target(target):
+    """Make a finished ``--target`` build the live index."""
+    from app.core.config import settings
+
+    if settings.VECTOR_STORE_BACKEND != "local":
+        # PostgREST can't rename tables; print the statements instead
+        print(f"Built {target}; swap it in from the Supabase SQL editor:")
+        print("  BEGIN;")
+        print("  ALTER TABLE idea_embeddings RENAME TO idea_embeddings_old;")
+        print(f"  ALTER TABLE {target} RENAME TO idea_embeddings;")
+        print("  COMMIT;")
+        return
+
+    live_path = settings.LOCAL_INDEX_PATH
+    if os.path.exists(live_path):
+        old_path = f"{live_path.rstrip(os.sep)}.old-{int(time.time())}"
+        os.rename(live_path, old_path)
+        print(f"Moved the previous index to {old_path}")
+    os.rename(target, live_path)
+    print(f"Swapped {target} in as {live_path}; restart the API to load it")
+
+def reindex(workers=1, chunk_size=1000, batch_size=None, checkpoint_path=DEFAULT_CHECKPOINT, restart=False,
+            target=None):
+    """Re-embed every idea and upsert it into the configured vector store.
+
+    IDs are streamed in chunks of ``chunk_size`` and each chunk is fetched,
+    embedded and written by one of ``workers`` processes, so memory stays
+    bounded by the chunks in flight. The highest ID below which every chunk
+    has been written is checkpointed, so an interrupted run resumes there.
+
+    With ``target`` (an index directory for the local backend, a table with
+    the ``idea_embeddings`` schema for Supabase) the run builds a separate
+    index and swaps it in at the end, which is how to switch to a model with
+    a different ``EMBEDDING_DIMENSION``.
+    """
+    import psycopg2
+    from app.core.config import settings
+    from app.rag.vector_store import get_vector_store
+
+    if target and settings.VECTOR_STORE_BACKEND == "local" and \
+            os.path.abspath(target) == os.path.abspath(settings.LOCAL_INDEX_PATH or ""):
+        print("Error: --target must differ from LOCAL_INDEX_PATH")
+        sys.exit(1)
+
+    expected = {
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "embedding_dimension": settings.EMBEDDING_DIMENSION,
+        "target": target
+    }
+    checkpoint = None if restart else _load_checkpoint(checkpoint_path)
+    if checkpoint:
+        for key, value in expected.items():
+            if checkpoint.get(key) != value:
+                print(
+                    f"Error: checkpoint was written for {key}={checkpoint.get(key)}, "
+                    f"not {value}; pass --restart to start over"
+                )
+                sys.exit(1)
+
+    checkpoint = checkpoint or {"last_id": 0, "rows": 0, **expected}
+    if checkpoint["last_id"]:
+        print(f"Resuming after idea {checkpoint['last_id']} ({checkpoint['rows']} rows already done)")
+
+    # Split the cores between workers instead of letting each torch use all of them
+    os.environ.setdefault("TORCH_NUM_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+
+    # Fail here, with the real error, rather than inside every worker
+    try:
+        conn = psycopg2.connect(settings.NEON_DB_URL)
+    except Exception as e:
+        print(f"Error: cannot reach the database: {e}")
+        sys.exit(1)
+
+    live_path = settings.LOCAL_INDEX_PATH
+    if target:
+        _use_target(target)
+    try:
+        get_vector_store().ping()
+    except ValueError as e:
+        # e.g. an index built with another EMBEDDING_DIMENSION
+        conn.close()
+        print(f"Error: {e}")
+        if not target:
+            print("Pass --target to build a new index and swap it in when done")
+        sys.exit(1)
+    except Exception as e:
+        conn.close()
+        print(f"Error: cannot reach the vector store: {e}")
+        sys.exit(1)
+    settings.LOCAL_INDEX_PATH = live_path
+
+    context = multiprocessing.get_context("spawn")
+    pool = context.Pool(workers, initializer=_init_worker, initargs=(batch_size, target))
+
+    start = time.perf_counter()
+    rows = 0
+    chunks = 0
+    fetch_seconds = 0.0
+    index_seconds = 0.0
+    failed = False
+
+    # Results are consumed in submission order so the checkpoint never skips a chunk
+    pending = deque()
+    chunk_iter = _iter_chunks(conn, checkpoint["last_id"], chunk_size)
+
+    try:
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = next(chunk_iter, None)
+                if chunk is None:
+                    break
+                pending.append(pool.apply_async(_reindex_chunk, (chunk,)))
+
+            if not pending:
+                break
+
+            result = pending.popleft().get()
+            rows += result["rows"]
+            chunks += 1
+            fetch_seconds += result["fetch_seconds"]
+            index_seconds += result["index_seconds"]
+
+            checkpoint["last_id"] = result["last_id"]
+            checkpoint["rows"] += result["rows"]
+            checkpoint["updated_at"] = time.time()
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+            elapsed = time.perf_counter() - start
+            print(f"Indexed {rows} rows up to idea {result['last_id']} ({rows / elapsed:.1f} rows/s)")
+    except KeyboardInterrupt:
+        failed = True
+        print("Interrupted")
+    except Exception as e:
+        failed = True
+        print(f"Error reindexing: {e}")
+    finally:
+        pool.terminate()
+        pool.join()
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    print("Reindex report")
+    print(f"  rows:           {rows} in {chunks} chunks of up to {chunk_size}")
+    print(f"  workers:        {workers}")
+    print(f"  elapsed:        {elapsed:.1f}s")
+    print(f"  throughput:     {rows / elapsed if elapsed > 0 else 0.0:.1f} rows/s")
+    print(f"  fetch time:     {fetch_seconds:.1f}s (summed over workers)")
+    print(f"  embed + write:  {index_seconds:.1f}s (summed over workers)")
+    print(f"  checkpoint:     idea {checkpoint['last_id']} in {checkpoint_path}")
+
+    if failed:
+        sys.exit(1)
+
+    # A finished run starts from the beginning next time
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    if target:
+        _swap_target(target)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed all ideas into the vector store")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Ideas per chunk")
+    parser.add_argument("--batch-size", type=int, default=None, help="Embedding batch size")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Checkpoint file")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over")
+    parser.add_argument(
+        "--target",
+        default=None,
+        help="Build into this index directory (local) or table (Supabase), then swap it in"
+    )
+    args = parser.parse_args()
+
+    reindex(
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart,
+        target=args.target
+    )
\ No newline at end of file
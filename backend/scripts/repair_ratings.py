@@ -0,0 +1,45 @@
+import argparse
+import os
+import sys
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from app.db.ratings import repair_rating_aggregates
+
+def repair_ratings(idea_ids=None):
+    """Re-derive the rating aggregates on ideas from the feedback table."""
+    db_url = os.getenv("NEON_DB_URL")
+    if not db_url:
+        print("Error: NEON_DB_URL environment variable not set")
+        sys.exit(1)
+    
+    conn = None
+    try:
+        conn = psycopg2.connect(db_url, cursor_factory=RealDictCursor)
+        cursor = conn.cursor()
+        
+        repaired = repair_rating_aggregates(cursor, idea_ids)
+        conn.commit()
+        
+        print(f"Repaired rating aggregates for {repaired} ideas")
+        
+    except Exception as e:
+        print(f"Error repairing rating aggregates: {e}")
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute avg_rating, feedback_count and rating_sum")
+    parser.add_argument("idea_ids", nargs="*", type=int, help="Only repair these ideas (default: all)")
+    args = parser.parse_args()
+    
+    repair_ratings(args.idea_ids or None)
@@ -31,7 +31,8 @@ def setup_postgres_db():
             keywords TEXT[],
             created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
             avg_rating FLOAT DEFAULT 0,
-            feedback_count INT DEFAULT 0
+            feedback_count INT DEFAULT 0,
+            rating_sum BIGINT NOT NULL DEFAULT 0
         )
         """)
         
@@ -46,10 +47,31 @@ def setup_postgres_db():
         )
         """)
         
+        # Create outbox of pending vector index operations
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS index_outbox (
+            id BIGSERIAL PRIMARY KEY,
+            idea_id INTEGER NOT NULL,
+            operation TEXT NOT NULL CHECK (operation IN ('index', 'update', 'delete')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        
         # Create indexes
-        cursor.execute("CREATE INDEX IF NOT EXISTS ideas_topic_idx ON ideas(topic)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS ideas_created_at_idx ON ideas(created_at)")
+        # Keyset pagination on (created_at, id), alone or within a topic;
+        # the trailing avg_rating lets min_rating be checked in the index
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ideas_created_at_id_rating_idx ON ideas(created_at DESC, id DESC, avg_rating)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ideas_topic_created_at_id_rating_idx "
+            "ON ideas(topic, created_at DESC, id DESC, avg_rating)"
+        )
         cursor.execute("CREATE INDEX IF NOT EXISTS feedback_idea_id_idx ON feedback(idea_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS index_outbox_ready_idx ON index_outbox(next_attempt_at, id)")
         
         conn.commit()
         print("PostgreSQL tables created successfully")
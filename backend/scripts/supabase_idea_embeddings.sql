@@ -0,0 +1,13 @@
+-- Run once in the Supabase SQL editor before enabling the index outbox.
+-- Upserts into idea_embeddings conflict on idea_id, which needs a unique
+-- index; tables filled by the old insert-only indexer may hold several rows
+-- per idea, so keep one row for each idea_id first (they hold the same
+-- idea, and the next reindex refreshes it anyway).
+
+DELETE FROM idea_embeddings a
+USING idea_embeddings b
+WHERE a.idea_id = b.idea_id
+  AND a.ctid < b.ctid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idea_embeddings_idea_id_key
+    ON idea_embeddings (idea_id);
\ No newline at end of file
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Run from anywhere: make the ``app`` package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The "*" default is not a valid AnyHttpUrl, so settings need an explicit list
+os.environ.setdefault("CORS_ORIGINS", '["http://localhost:3000"]')
\ No newline at end of file
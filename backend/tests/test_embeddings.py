@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from app.ml.embeddings import normalize_embeddings, top_k_similarity
+
+def _brute_force(queries, candidates, k):
+    scores = normalize_embeddings(queries) @ normalize_embeddings(candidates).T
+    indices = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return indices, np.take_along_axis(scores, indices, axis=1)
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(3, 8)).astype(np.float32), rng.normal(size=(50, 8)).astype(np.float32)
+
+@pytest.mark.parametrize("max_bytes", [1, 4 * 3 * 7, 1 << 20])
+def test_chunked_matches_brute_force(data, max_bytes):
+    queries, candidates = data
+    indices, scores = top_k_similarity(queries, candidates, k=5, max_bytes=max_bytes)
+    expected_indices, expected_scores = _brute_force(queries, candidates, 5)
+
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+def test_single_query_returns_1d(data):
+    queries, candidates = data
+    indices, scores = top_k_similarity(queries[0], candidates, k=4, max_bytes=64)
+
+    assert indices.shape == scores.shape == (4,)
+    np.testing.assert_array_equal(indices, _brute_force(queries[:1], candidates, 4)[0][0])
+
+def test_threshold_pads_matrix_and_trims_single(data):
+    queries, candidates = data
+    threshold = 0.3
+
+    indices, scores = top_k_similarity(queries, candidates, k=50, threshold=threshold, max_bytes=128)
+    for row in range(len(queries)):
+        _, expected = _brute_force(queries[row:row + 1], candidates, 50)
+        kept = int((expected[0] >= threshold).sum())
+        assert (indices[row] >= 0).sum() == kept
+        assert np.isneginf(scores[row, kept:]).all()
+
+    single_indices, single_scores = top_k_similarity(queries[0], candidates, k=50, threshold=threshold)
+    assert (single_scores >= threshold).all()
+    assert len(single_indices) == (indices[0] >= 0).sum()
+
+def test_mask_excludes_rows(data):
+    queries, candidates = data
+    mask = np.ones(len(candidates), dtype=bool)
+    best = _brute_force(queries[:1], candidates, 3)[0][0]
+    mask[best[:2]] = False
+
+    indices, _ = top_k_similarity(queries[0], candidates, k=3, candidate_mask=mask, max_bytes=64)
+    assert not set(indices.tolist()) & set(best[:2].tolist())
+    assert indices[0] == best[2]
+
+def test_k_larger_than_candidates(data):
+    queries, candidates = data
+    indices, _ = top_k_similarity(queries, candidates[:2], k=5)
+    assert indices.shape == (3, 2)
+
+def test_prenormalized_inputs_are_used_as_is(data):
+    queries, candidates = data
+    unit_queries, unit_candidates = normalize_embeddings(queries), normalize_embeddings(candidates)
+
+    indices, scores = top_k_similarity(unit_queries, unit_candidates, k=5, normalized=True, max_bytes=100)
+    expected_indices, expected_scores = _brute_force(queries, candidates, 5)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
\ No newline at end of file
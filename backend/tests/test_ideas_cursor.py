@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("supabase")
+
+from fastapi import HTTPException
+
+from app.api.routes.ideas import _decode_cursor, _encode_cursor
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2024, 5, 1, 12, 30, 15, 123456),
+    datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+    datetime(2024, 5, 1, 12, 30, tzinfo=timezone(timedelta(hours=5, minutes=30)))
+])
+def test_cursor_round_trip(created_at):
+    cursor = _encode_cursor(created_at, 42)
+
+    assert "=" not in cursor
+    assert _decode_cursor(cursor) == (created_at, 42)
+
+def test_cursor_is_url_safe():
+    cursor = _encode_cursor(datetime(2024, 5, 1, 12, 30), 2 ** 40)
+    assert all(char.isalnum() or char in "-_" for char in cursor)
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    "e30",  # {}
+    "eyJjcmVhdGVkX2F0IjogIm5vdCBhIGRhdGUiLCAiaWQiOiAxfQ",  # bad created_at
+    "eyJjcmVhdGVkX2F0IjogIjIwMjQtMDUtMDFUMTI6MzA6MDAiLCAiaWQiOiAieCJ9"  # bad id
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(cursor)
+    assert error.value.status_code == 400
\ No newline at end of file
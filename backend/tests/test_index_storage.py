@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.rag.index_storage import IndexStorage
+
+DIMENSION = 4
+
+def _append(storage, ids):
+    vectors = np.arange(len(ids) * DIMENSION, dtype=np.float32).reshape(len(ids), DIMENSION)
+    records = [{"idea_id": idea_id, "title": f"idea {idea_id}"} for idea_id in ids]
+    with storage.lock():
+        storage.append(storage.current_version(), vectors, np.array(ids, dtype=np.int64), records)
+    return vectors
+
+def test_new_index_is_empty(tmp_path):
+    storage = IndexStorage(str(tmp_path), DIMENSION)
+    version = storage.current_version()
+
+    manifest = storage.read_manifest(version)
+    assert manifest["count"] == 0
+    assert manifest["dimension"] == DIMENSION
+    assert storage.open_vectors(version, 0).shape == (0, DIMENSION)
+
+def test_append_commits_rows(tmp_path):
+    storage = IndexStorage(str(tmp_path), DIMENSION)
+    vectors = _append(storage, [1, 2, 3])
+    version = storage.current_version()
+
+    count = storage.read_manifest(version)["count"]
+    assert count == 3
+    np.testing.assert_array_equal(storage.open_vectors(version, count), vectors)
+    np.testing.assert_array_equal(storage.open_ids(version, count), [1, 2, 3])
+    records, _ = storage.read_metadata(version, 0, count)
+    assert [record["title"] for record in records] == ["idea 1", "idea 2", "idea 3"]
+    assert not storage.read_tombstones(version, count).any()
+
+def test_append_drops_uncommitted_bytes(tmp_path):
+    storage = IndexStorage(str(tmp_path), DIMENSION)
+    _append(storage, [1])
+    version = storage.current_version()
+
+    # A writer that died between the data files and the manifest
+    with open(os.path.join(str(tmp_path), version, "vectors.f32"), "ab") as f:
+        f.write(b"\x00" * 7)
+
+    vectors = _append(storage, [2])
+    np.testing.assert_array_equal(storage.open_ids(version, 2), [1, 2])
+    np.testing.assert_array_equal(storage.open_vectors(version, 2)[1], vectors[0])
+
+def test_mark_deleted_sets_tombstones_once(tmp_path):
+    storage = IndexStorage(str(tmp_path), DIMENSION)
+    _append(storage, list(range(10)))
+    version = storage.current_version()
+
+    with storage.lock():
+        storage.mark_deleted(version, [1, 8])
+        storage.mark_deleted(version, [8])
+
+    deleted = storage.read_tombstones(version, 10)
+    assert np.flatnonzero(deleted).tolist() == [1, 8]
+    assert storage.read_manifest(version)["deleted"] == 2
+
+def test_compact_drops_deleted_rows_and_swaps_current(tmp_path):
+    storage = IndexStorage(str(tmp_path), DIMENSION)
+    vectors = _append(storage, [10, 11, 12, 13])
+    old_version = storage.current_version()
+    with storage.lock():
+        storage.mark_deleted(old_version, [0, 2])
+
+    new_version = storage.compact(chunk_rows=1)
+
+    assert storage.current_version() == new_version != old_version
+    assert not os.path.exists(os.path.join(str(tmp_path), old_version))
+
+    manifest = storage.read_manifest(new_version)
+    assert manifest["count"] == 2
+    assert manifest["deleted"] == 0
+    np.testing.assert_array_equal(storage.open_ids(new_version, 2), [11, 13])
+    np.testing.assert_array_equal(storage.open_vectors(new_version, 2), vectors[[1, 3]])
+    records, _ = storage.read_metadata(new_version, 0, 2)
+    assert [record["idea_id"] for record in records] == [11, 13]
+
+def test_reopen_reads_current_version(tmp_path):
+    storage = IndexStorage(str(tmp_path), DIMENSION)
+    _append(storage, [1, 2])
+    with storage.lock():
+        storage.mark_deleted(storage.current_version(), [0])
+    version = storage.compact()
+
+    reopened = IndexStorage(str(tmp_path), DIMENSION)
+    assert reopened.current_version() == version
+    np.testing.assert_array_equal(reopened.open_ids(version, 1), [2])
+
+def test_dimension_mismatch_raises(tmp_path):
+    IndexStorage(str(tmp_path), DIMENSION)
+    with pytest.raises(ValueError, match="dimension"):
+        IndexStorage(str(tmp_path), DIMENSION + 1)
\ No newline at end of file
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("supabase")
+
+from app.rag.local_index import LocalVectorStore
+
+DIMENSION = 4
+
+def _record(idea_id, vector, **metadata):
+    return {"idea_id": idea_id, "title": f"idea {idea_id}", "content": "", "embedding": vector, **metadata}
+
+def _store(path=None):
+    # ann_threshold keeps the tests on exact search whether or not hnswlib is installed
+    return LocalVectorStore(dimension=DIMENSION, ann_threshold=10 ** 9, path=path)
+
+def _ids(results):
+    return [result["id"] for result in results]
+
+@pytest.fixture(params=["memory", "disk"])
+def store(request, tmp_path):
+    return _store(str(tmp_path) if request.param == "disk" else None)
+
+def test_search_ranks_by_cosine_similarity(store):
+    store.add([
+        _record(1, [1, 0, 0, 0]),
+        _record(2, [1, 1, 0, 0]),
+        _record(3, [0, 0, 1, 0])
+    ])
+
+    results = store.search(np.array([1, 0, 0, 0]), top_k=2, similarity_threshold=0.5)
+    assert _ids(results) == [1, 2]
+    assert results[0]["similarity_score"] == pytest.approx(1.0)
+    assert results[1]["similarity_score"] == pytest.approx(1 / np.sqrt(2))
+
+def test_upsert_replaces_existing_record(store):
+    store.add([_record(1, [1, 0, 0, 0], topic="old")])
+    store.upsert([_record(1, [0, 1, 0, 0], topic="new")])
+
+    assert len(store) == 1
+    assert store.search(np.array([1, 0, 0, 0]), top_k=5, similarity_threshold=0.5) == []
+    assert store.get(1)["topic"] == "new"
+    np.testing.assert_allclose(store.get_embedding(1), [0, 1, 0, 0])
+
+def test_delete_tombstones_record(store):
+    store.add([_record(1, [1, 0, 0, 0]), _record(2, [1, 0.1, 0, 0])])
+    store.delete(1)
+
+    assert len(store) == 1
+    assert store.get(1) is None
+    assert _ids(store.search(np.array([1, 0, 0, 0]), top_k=5, similarity_threshold=0.0)) == [2]
+
+def test_filters_match_scalars_and_lists(store):
+    store.add([
+        _record(1, [1, 0, 0, 0], topic="ai", keywords=["ml", "nlp"]),
+        _record(2, [1, 0, 0, 0], topic="ai", keywords=["vision"]),
+        _record(3, [1, 0, 0, 0], topic="web", keywords=["ml"])
+    ])
+    query = np.array([1, 0, 0, 0])
+
+    assert sorted(_ids(store.search(query, 5, 0.0, filters={"topic": "ai"}))) == [1, 2]
+    assert sorted(_ids(store.search(query, 5, 0.0, filters={"keywords": "ml"}))) == [1, 3]
+    assert _ids(store.search(query, 5, 0.0, filters={"topic": "ai", "keywords": "ml"})) == [1]
+    assert store.search(query, 5, 0.0, filters={"topic": "missing"}) == []
+
+def test_second_store_sees_writes_and_compaction(tmp_path):
+    writer = _store(str(tmp_path))
+    reader = _store(str(tmp_path))
+
+    writer.add([_record(idea_id, [1, idea_id, 0, 0]) for idea_id in range(1, 6)])
+    writer.delete(2)
+    writer.delete(4)
+    assert sorted(_ids(reader.search(np.array([1, 0, 0, 0]), 10, -1.0))) == [1, 3, 5]
+
+    writer.compact()
+    assert sorted(_ids(reader.search(np.array([1, 0, 0, 0]), 10, -1.0))) == [1, 3, 5]
+    assert len(reader) == 3
+
+    # Writes after the swap land in the new version
+    reader.add([_record(6, [0, 0, 0, 1])])
+    assert _ids(writer.search(np.array([0, 0, 0, 1]), 1, 0.5)) == [6]
+
+def test_reopen_restores_live_rows(tmp_path):
+    store = _store(str(tmp_path))
+    store.add([_record(1, [1, 0, 0, 0]), _record(2, [0, 1, 0, 0])])
+    store.delete(1)
+
+    reopened = _store(str(tmp_path))
+    assert len(reopened) == 1
+    assert reopened.get(2)["title"] == "idea 2"
+
+def test_wrong_dimension_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.add([_record(1, [1, 0, 0])])
\ No newline at end of file
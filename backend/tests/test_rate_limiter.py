@@ -0,0 +1,80 @@
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.api.middlewares import rate_limiter
+from app.api.middlewares.rate_limiter import LocalRateLimitBackend, SQLiteRateLimitBackend, _take
+
+def test_take_spends_and_refills():
+    assert _take(tokens=5, updated=0, now=0, cost=2, capacity=5, rate=1) == (True, 3, 0.0)
+
+    # Two seconds at one token per second, capped at capacity
+    allowed, tokens, _ = _take(tokens=0, updated=0, now=2, cost=1, capacity=5, rate=1)
+    assert allowed and tokens == 1
+    allowed, tokens, _ = _take(tokens=4, updated=0, now=100, cost=1, capacity=5, rate=1)
+    assert allowed and tokens == 4
+
+def test_take_rejects_with_retry_after():
+    allowed, tokens, retry_after = _take(tokens=1, updated=0, now=0, cost=3, capacity=5, rate=0.5)
+    assert not allowed
+    assert tokens == 1
+    assert retry_after == pytest.approx(4.0)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", fake)
+    monkeypatch.setattr(rate_limiter.time, "time", fake)
+    return fake
+
+@pytest.fixture(params=["local", "sqlite"])
+def backend(request, tmp_path, clock):
+    if request.param == "local":
+        return LocalRateLimitBackend(idle_ttl=60)
+    return SQLiteRateLimitBackend(str(tmp_path / "rate_limit.db"), idle_ttl=60)
+
+def test_bucket_limits_burst_then_refills(backend, clock):
+    results = [backend.consume("client", cost=1, capacity=3, rate=1)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+    allowed, retry_after = backend.consume("client", cost=1, capacity=3, rate=1)
+    assert not allowed and retry_after == pytest.approx(1.0)
+
+    clock.now += 1
+    assert backend.consume("client", cost=1, capacity=3, rate=1)[0]
+
+def test_buckets_are_per_key(backend):
+    assert backend.consume("a", cost=3, capacity=3, rate=1)[0]
+    assert not backend.consume("a", cost=1, capacity=3, rate=1)[0]
+    assert backend.consume("b", cost=1, capacity=3, rate=1)[0]
+
+def test_route_cost_is_charged(backend):
+    assert backend.consume("client", cost=5, capacity=6, rate=1)[0]
+    assert not backend.consume("client", cost=5, capacity=6, rate=1)[0]
+    assert backend.consume("client", cost=1, capacity=6, rate=1)[0]
+
+def test_local_backend_evicts_idle_and_excess_keys(clock):
+    backend = LocalRateLimitBackend(idle_ttl=60, max_keys=2)
+    for key in ("a", "b", "c"):
+        backend.consume(key, cost=1, capacity=3, rate=1)
+    assert backend.size() == 2
+
+    clock.now += 61
+    backend.consume("d", cost=1, capacity=3, rate=1)
+    assert backend.size() == 1
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / "rate_limit.db")
+    first = SQLiteRateLimitBackend(path, idle_ttl=60)
+    second = SQLiteRateLimitBackend(path, idle_ttl=60)
+
+    assert first.consume("client", cost=2, capacity=3, rate=1)[0]
+    assert not second.consume("client", cost=2, capacity=3, rate=1)[0]
+    assert second.size() == 1
\ No newline at end of file
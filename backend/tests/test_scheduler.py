@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.api.middlewares.scheduler import RequestScheduler, SchedulerRejectedError, WorkloadClass
+
+def _scheduler(max_concurrency=1, max_queue=10, deadline=5.0):
+    return RequestScheduler(
+        [
+            WorkloadClass("read", 0, max_concurrency, max_queue, deadline),
+            WorkloadClass("search", 1, max_concurrency, max_queue, deadline),
+            WorkloadClass("generation", 2, max_concurrency, max_queue, deadline)
+        ],
+        max_concurrency=max_concurrency
+    )
+
+def test_queued_classes_are_admitted_in_priority_order():
+    async def run():
+        scheduler = _scheduler()
+        order = []
+
+        async def request(name):
+            await scheduler.acquire(name)
+            order.append(name)
+            await asyncio.sleep(0)
+            scheduler.release(name)
+
+        await scheduler.acquire("generation")
+
+        # Queued lowest priority first; the shared slot is held meanwhile
+        waiters = [asyncio.ensure_future(request(name)) for name in ("generation", "search", "read")]
+        await asyncio.sleep(0)
+        assert scheduler.get_stats()["classes"]["generation"]["queued"] == 1
+
+        scheduler.release("generation")
+        await asyncio.gather(*waiters)
+        return order
+
+    assert asyncio.run(run()) == ["read", "search", "generation"]
+
+def test_fifo_within_a_class():
+    async def run():
+        scheduler = _scheduler()
+        order = []
+
+        async def request(label):
+            await scheduler.acquire("search")
+            order.append(label)
+            scheduler.release("search")
+
+        await scheduler.acquire("search")
+        waiters = [asyncio.ensure_future(request(label)) for label in range(3)]
+        await asyncio.sleep(0)
+        scheduler.release("search")
+        await asyncio.gather(*waiters)
+        return order
+
+    assert asyncio.run(run()) == [0, 1, 2]
+
+def test_release_hands_slot_to_queue_before_newcomers():
+    async def run():
+        scheduler = _scheduler()
+        await scheduler.acquire("generation")
+        queued = asyncio.ensure_future(scheduler.acquire("search"))
+        await asyncio.sleep(0)
+
+        scheduler.release("generation")
+        newcomer = asyncio.ensure_future(scheduler.acquire("read"))
+        await queued
+        await asyncio.sleep(0)
+        stats = scheduler.get_stats()
+
+        scheduler.release("search")
+        await newcomer
+        scheduler.release("read")
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["classes"]["search"]["active"] == 1
+    assert stats["classes"]["read"]["active"] == 0
+    assert stats["classes"]["read"]["queued"] == 1
+
+def test_full_queue_is_rejected():
+    async def run():
+        scheduler = _scheduler(max_queue=1)
+        await scheduler.acquire("generation")
+        waiter = asyncio.ensure_future(scheduler.acquire("generation"))
+        await asyncio.sleep(0)
+
+        try:
+            with pytest.raises(SchedulerRejectedError) as error:
+                await scheduler.acquire("generation")
+            return error.value, scheduler.get_stats()["classes"]["generation"]
+        finally:
+            scheduler.release("generation")
+            await waiter
+
+    error, stats = asyncio.run(run())
+    assert error.reason == "queue full"
+    assert stats["rejected"] == 1
+
+def test_deadline_expires_queued_request():
+    async def run():
+        scheduler = _scheduler(deadline=0.01)
+        await scheduler.acquire("read")
+        with pytest.raises(SchedulerRejectedError) as error:
+            await scheduler.acquire("read")
+        scheduler.release("read")
+        return error.value, scheduler.get_stats()
+
+    error, stats = asyncio.run(run())
+    assert error.reason == "deadline exceeded"
+    assert stats["classes"]["read"]["expired"] == 1
+    assert stats["classes"]["read"]["queued"] == 0
+    assert stats["active"] == 0
\ No newline at end of file